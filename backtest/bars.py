@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# yfinance interval -> (bar length, how far back Yahoo serves it, longest span per request)
+INTERVALS = {
+    '1m': (pd.Timedelta(minutes=1), pd.Timedelta(days=30), pd.Timedelta(days=7)),
+    '5m': (pd.Timedelta(minutes=5), pd.Timedelta(days=60), pd.Timedelta(days=60)),
+    '15m': (pd.Timedelta(minutes=15), pd.Timedelta(days=60), pd.Timedelta(days=60)),
+    '1h': (pd.Timedelta(hours=1), pd.Timedelta(days=730), pd.Timedelta(days=730)),
+    '1d': (pd.Timedelta(days=1), None, None),
+}
+
+
+def is_intraday(interval):
+    return interval != '1d'
+
+
+def compact_ohlcv(stock_data):
+    # Storage format only: float32 prices and int32 volume halve the Parquet files and the cached
+    # frames, and float32 keeps ~7 significant digits, well beyond the cent resolution of quotes.
+    # Every consumer (pipeline, sweeps, optimizer) converts the columns it uses to float64 arrays.
+    stock_data = stock_data.astype({column: np.float32 for column in stock_data.columns if column != 'Volume'})
+    if 'Volume' in stock_data:
+        stock_data['Volume'] = stock_data['Volume'].fillna(0).clip(upper=np.iinfo(np.int32).max).astype(np.int32)
+    return stock_data
+
+
+def session_ohlc(stock_data):
+    # Collapse intraday bars into one bar per trading day (first open, max high, min low, last close)
+    sessions = stock_data.groupby(stock_data.index.normalize())
+    aggregated = sessions.agg({'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                               **({'Volume': 'sum'} if 'Volume' in stock_data else {})})
+    aggregated.index.name = 'Date'
+    return aggregated
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.engine import expand_ledger
+from backtest.metrics import TRADING_DAYS, equity_metrics
+from backtest.pipeline import data_fingerprint, default_pipeline
+from backtest.sweep import sweep_equity, sweep_trades
+
+SIGNAL_COLUMNS = ('Close',)  # all the bands and signals read; Open enters trade keys only for next-open fills
+
+
+def open_prices(stock_data):
+    # Only next-open fills need the Open column, and the Bollinger frames may have dropped it
+    return stock_data['Open'].to_numpy(dtype=float) if 'Open' in stock_data else None
+
+
+def backtest_metrics(stock_data, initial_investment, buy_portion, sell_portion, periods_per_year=TRADING_DAYS, pipeline=default_pipeline,
+                     costs=FRICTIONLESS):
+    # Pass the same frame and costs as add_stock_data to reuse its cached trade ledger
+    close = stock_data['Close'].to_numpy(dtype=float)
+    return pipeline.performance(data_fingerprint(stock_data, SIGNAL_COLUMNS), close, initial_investment, buy_portion, sell_portion, periods_per_year,
+                                costs=costs, open_=open_prices(stock_data))
+
+
+def add_stock_data(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion, pipeline=default_pipeline,
+                   costs=FRICTIONLESS):
+    # Every column comes from a cached pipeline node keyed on the price data's fingerprint,
+    # so e.g. changing buy_portion only re-runs the trade simulation
+    data_key = data_fingerprint(stock_data, SIGNAL_COLUMNS)
+    close = stock_data['Close'].to_numpy(dtype=float)
+    stock_data = stock_data.copy()
+
+    for period in moving_average_periods:
+        stock_data[f'SMA_{period}'] = pipeline.moving_average(data_key, close, period)
+    stock_data['BB_mid_20'], stock_data['BB_upper_20'], stock_data['BB_lower_20'] = pipeline.bollinger_bands(data_key, close)
+
+    stock_data['Signal'] = pipeline.signals(data_key, close)
+    ledger = pipeline.trades(data_key, close, initial_investment, buy_portion, sell_portion,
+                             costs=costs, open_=open_prices(stock_data))
+    (stock_data['Trade_Amount'], stock_data['Trade_Count'],
+     stock_data['Shares_held'], stock_data['Portfolio_Value']) = expand_ledger(ledger, close, initial_investment)
+    return stock_data
+
+
+def multiple_backtest(stock_data, initial_investment, buy_portions=range(2, 21), sell_portions=range(2, 11),
+                      pipeline=default_pipeline, metrics=False, rank_by='Final Portfolio Value', periods_per_year=TRADING_DAYS,
+                      costs=FRICTIONLESS):
+    # Signals are computed once, then every (buy, sell) pair is simulated in one pass.
+    # With metrics=True the sweep keeps every pair's equity curve (pairs x bars) and adds the
+    # equity_metrics columns, so rank_by can be a risk-adjusted measure such as 'Sharpe'.
+    stock_data = stock_data.sort_index(ascending=True)
+    close = stock_data['Close'].to_numpy(dtype=float)
+    signal = pipeline.signals(data_fingerprint(stock_data, SIGNAL_COLUMNS), close)
+    buy_grid, sell_grid = np.meshgrid(buy_portions, sell_portions, indexing='ij')
+    if metrics:
+        equity = sweep_equity(close, signal, initial_investment, buy_portions, sell_portions, costs, open_prices(stock_data))
+        final_values = equity[:, -1]
+    else:
+        final_values = sweep_trades(close, signal, initial_investment, buy_portions, sell_portions, costs, open_prices(stock_data))
+
+    results_df = pd.DataFrame({
+        'Buy Portion': buy_grid.ravel(),
+        'Sell Portion': sell_grid.ravel(),
+        'Final Portfolio Value': final_values.ravel(),
+    })
+    results_df['Total Profit Ratio (%)'] = (results_df['Final Portfolio Value'] - initial_investment) / initial_investment * 100
+    if metrics:
+        for name, values in equity_metrics(equity, periods_per_year).items():
+            results_df[name] = values
+
+    # rank_by sort descending, add ranking
+    results_df['Profit Ranking'] = results_df[rank_by].rank(ascending=False, method='min', na_option='bottom').astype(int)
+    return results_df
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.metrics import TRADING_DAYS, equity_metrics
+from backtest.pipeline import data_fingerprint, default_pipeline
+from backtest.sweep import breakout_equity
+
+
+def ohlc_arrays(stock_data):
+    return [stock_data[column].to_numpy(dtype=float) for column in ('Open', 'High', 'Low', 'Close')]
+
+
+def backtest_metrics(stock_data, breakout_multiplier, initial_investment, periods_per_year=TRADING_DAYS, pipeline=default_pipeline,
+                     costs=FRICTIONLESS):
+    # Pass the same frame and costs as add_stock_data to reuse its cached breakout columns
+    stock_data = pd.DataFrame(stock_data, dtype="float")
+    return pipeline.breakout_performance(data_fingerprint(stock_data), *ohlc_arrays(stock_data), breakout_multiplier,
+                                         initial_investment, periods_per_year, costs)
+
+
+def add_stock_data(stock_data, breakout_multiplier, pipeline=default_pipeline, costs=FRICTIONLESS):
+    # Range / k / Target / Buy / ror / Profit columns, served from the cached pipeline node for this k; with costs
+    # the fill at Target and the exit at Close pay spread, slippage and bps commission
+    stock_data = pd.DataFrame(stock_data, dtype="float")
+    columns = pipeline.breakout(data_fingerprint(stock_data), *ohlc_arrays(stock_data), breakout_multiplier, costs)
+    stock_data['Range'] = columns['Range']
+    stock_data['k'] = breakout_multiplier
+    for column in ('Target', 'Buy', 'ror', 'Profit'):
+        stock_data[column] = columns[column]
+    return stock_data
+
+
+def simulate_trading(stock_data, initial_investment, costs=FRICTIONLESS):
+    # Fixed per-order fees depend on the account size, so they are only charged here
+    if costs.commission_fixed:
+        stock_data['Portfolio_Value'] = costs.compound(stock_data['ror'].to_numpy(), stock_data['Buy'].to_numpy(), initial_investment)
+    else:
+        stock_data['Portfolio_Value'] = stock_data['Profit'] * initial_investment
+    return stock_data
+
+
+def multiple_backtest(stock_data, initial_investment, breakout_multipliers=np.arange(0.1, 0.9, 0.1), pipeline=default_pipeline,
+                      metrics=False, rank_by='Final Portfolio Value', periods_per_year=TRADING_DAYS, costs=FRICTIONLESS):
+    # The shared columns are built once and every k is evaluated in the same (k x time) array operation.
+    # With metrics=True the (k x time) equity curves are kept for the equity_metrics columns.
+    stock_data = pd.DataFrame(stock_data, dtype="float").sort_index(ascending=True)
+    if metrics:
+        equity = breakout_equity(*ohlc_arrays(stock_data), breakout_multipliers, initial_investment, costs)
+        final_portfolio_values = equity[:, -1]
+    else:
+        final_portfolio_values = pipeline.breakout_sweep(data_fingerprint(stock_data), *ohlc_arrays(stock_data),
+                                                         breakout_multipliers, initial_investment, costs)
+    results_df = pd.DataFrame({
+        'Magic Number(k)': list(breakout_multipliers),
+        'Final Portfolio Value': final_portfolio_values,
+        'Total Profit Ratio (%)': (final_portfolio_values - initial_investment) / initial_investment * 100
+    })
+    if metrics:
+        for name, values in equity_metrics(equity, periods_per_year).items():
+            results_df[name] = values
+    results_df['Profit Ranking'] = results_df[rank_by].rank(ascending=False, method='min', na_option='bottom').astype(int)
+    return results_df
@@ -0,0 +1,151 @@
+import argparse
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+
+from backtest.bars import is_intraday, session_ohlc
+from backtest.costs import ExecutionModel
+from backtest.metrics import equity_metrics, periods_per_year
+from backtest.optimizer import BOLLINGER, BREAKOUT, rank_results, run_optimization
+from backtest.plugins import STRATEGY_PLUGINS, run_strategies
+from backtest.search import SEARCHES, BollingerObjective, BreakoutObjective, optimize
+from backtest.store import PriceStore
+from backtest.tables import to_arrow, write_table
+
+STRATEGIES = {'bollinger': BOLLINGER, 'breakout': BREAKOUT}
+DEFAULT_PARAMS = {
+    BOLLINGER: {'buy_portions': list(range(2, 21)), 'sell_portions': list(range(2, 11))},
+    BREAKOUT: {'breakout_multipliers': np.round(np.arange(0.1, 0.9, 0.1), 4).tolist()},
+}
+# Jobs with a "search" entry can also vary the band settings; keys map to the job file lists
+SEARCH_SPACES = {
+    BOLLINGER: {'buy_portion': 'buy_portions', 'sell_portion': 'sell_portions', 'window': 'windows', 'num_std': 'num_stds'},
+    BREAKOUT: {'breakout_multiplier': 'breakout_multipliers'},
+}
+SEARCH_DEFAULTS = {'windows': [20], 'num_stds': [2]}
+OBJECTIVES = {BOLLINGER: BollingerObjective, BREAKOUT: BreakoutObjective}
+PARAM_COLUMNS = {'buy_portion': 'Buy Portion', 'sell_portion': 'Sell Portion', 'window': 'Window',
+                 'num_std': 'Num Std', 'breakout_multiplier': 'Magic Number(k)'}
+# Rows of other strategies leave these empty, so mixed jobs would otherwise print them as floats
+INTEGER_COLUMNS = ['Buy Portion', 'Sell Portion', 'Window', 'Max Drawdown Duration']
+
+logger = logging.getLogger(__name__)
+
+
+def load_jobs(path):
+    # Job file format:
+    # {"initial_investment": 1500000,
+    #  "jobs": [{"tickers": ["TQQQ", "QQQ"], "start": "2020-01-01", "end": "2024-01-01",
+    #            "strategy": "bollinger", "buy_portions": [5, 10], "sell_portions": [4]},
+    #           {"tickers": ["QQQ"], "start": "2024-06-01", "end": "2024-07-01", "interval": "5m",
+    #            "strategy": "bollinger"},
+    #           {"tickers": ["SOXL"], "start": "2020-01-01", "end": "2024-01-01",
+    #            "strategy": "breakout", "breakout_multipliers": [0.3, 0.4, 0.5]},
+    #           {"tickers": ["TQQQ"], "start": "2015-01-01", "end": "2024-01-01", "strategy": "bollinger",
+    #            "buy_portions": [2, 3, ..., 40], "windows": [10, 20, 30], "num_stds": [1.5, 2, 2.5],
+    #            "search": {"method": "tpe", "budget": 60, "seed": 0}},
+    #           {"tickers": ["QQQ"], "start": "2020-01-01", "end": "2024-01-01",
+    #            "runs": [["bollinger", {"buy_portion": 5}], ["breakout", {"breakout_multiplier": 0.4}]]}],
+    #  "costs": {"commission_bps": 5, "spread_bps": 2, "fill": "next_open"}}
+    # Without "search" every combination is run; with it only budget of them are evaluated.
+    # A "runs" job backtests the listed strategy plugins side by side instead of sweeping one strategy.
+    # "costs" takes the ExecutionModel fields; a job's own "costs" entries override the top-level ones.
+    config = json.loads(Path(path).read_text())
+    jobs = []
+    for job in config['jobs']:
+        costs = ExecutionModel(**{**config.get('costs', {}), **job.get('costs', {})})
+        if 'runs' in job:
+            runs = [(name, params) for name, params in job['runs']]
+            unknown = sorted({name for name, _ in runs} - set(STRATEGY_PLUGINS))
+            if unknown:
+                raise ValueError(f"Unknown strategy plugins {unknown}, expected some of {sorted(STRATEGY_PLUGINS)}")
+            jobs.append((job['tickers'], job['start'], job['end'], job.get('interval', '1d'), None, runs, None, costs))
+            continue
+        strategy = STRATEGIES[job['strategy']]
+        params = {name: job.get(name, default) for name, default in DEFAULT_PARAMS[strategy].items()}
+        search = job.get('search')
+        if search is not None:
+            if search.get('method', 'tpe') not in SEARCHES:
+                raise ValueError(f"Unknown search method {search['method']!r}, expected one of {sorted(SEARCHES)}")
+            params = {name: job.get(key, params.get(key, SEARCH_DEFAULTS.get(key)))
+                      for name, key in SEARCH_SPACES[strategy].items()}
+        jobs.append((job['tickers'], job['start'], job['end'], job.get('interval', '1d'), strategy, params, search, costs))
+    return config.get('initial_investment', 1500000), jobs
+
+
+def run_jobs(jobs, initial_investment, store, max_workers=None, rank_by='Total Profit Ratio (%)'):
+    results = []
+    for tickers, start, end, interval, strategy, params, search, costs in jobs:
+        price_data = {ticker: store.get(ticker, start, end, interval).dropna(how='any') for ticker in tickers}
+        bars_per_year = periods_per_year(interval)
+        if is_intraday(interval) and strategy == BREAKOUT:
+            price_data = {ticker: session_ohlc(stock_data) for ticker, stock_data in price_data.items()}
+            bars_per_year = periods_per_year('1d')
+        if strategy is None:
+            results.append(to_arrow(plugin_rows(price_data, start, end, params, initial_investment, costs, bars_per_year)))
+            continue
+        if search is not None:
+            results.append(to_arrow(search_rows(price_data, start, end, strategy, params, search, initial_investment, costs,
+                                                  bars_per_year)))
+            continue
+        for task_table in run_optimization(price_data, [(start, end)], {strategy: params}, initial_investment, max_workers, bars_per_year,
+                                           costs):
+            results.append(task_table)
+            if task_table.num_rows:
+                logger.info("%s %s %s..%s: %d backtests", strategy, task_table['Ticker'][0].as_py(), start, end, task_table.num_rows)
+    results_df = rank_results(results, rank_by)
+    return results_df.astype({column: 'Int64' for column in INTEGER_COLUMNS if column in results_df})
+
+
+def search_rows(price_data, start, end, strategy, space, search, initial_investment, costs, bars_per_year):
+    rows = []
+    for ticker, stock_data in price_data.items():
+        if stock_data.empty:
+            continue
+        objective = OBJECTIVES[strategy](stock_data, initial_investment, costs)
+        results_df = optimize(space, objective, **search).drop(columns='Profit Ranking')
+        # Same metric columns as grid jobs, from the full-series equity of every parameter set the search kept
+        equity = np.stack([objective.equity(params) for params in results_df[list(space)].to_dict('records')])
+        results_df = results_df.assign(**equity_metrics(equity, bars_per_year)).rename(columns=PARAM_COLUMNS)
+        logger.info("%s %s %s..%s: %d evaluations (%s)", strategy, ticker, start, end, objective.evaluations,
+                    search.get('method', 'tpe'))
+        rows.extend({'Ticker': ticker, 'Start Date': start, 'End Date': end, 'Strategy': strategy, **row}
+                    for row in results_df.to_dict('records'))
+    return rows
+
+
+def plugin_rows(price_data, start, end, runs, initial_investment, costs, bars_per_year):
+    # Every run shares the indicators the pipeline already computed for the ticker
+    rows = []
+    for ticker, stock_data in price_data.items():
+        if stock_data.empty:
+            continue
+        results_df, _ = run_strategies(stock_data, runs, initial_investment, costs=costs, periods_per_year=bars_per_year)
+        logger.info("%s %s..%s: %d strategy runs", ticker, start, end, len(results_df))
+        rows.extend({'Ticker': ticker, 'Start Date': start, 'End Date': end, **row}
+                    for row in results_df.rename(columns=PARAM_COLUMNS).to_dict('records'))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run backtests from a job file without the Streamlit apps.")
+    parser.add_argument('job_file')
+    parser.add_argument('-o', '--output', default='results.csv', help="Output path (.csv, .parquet or .feather)")
+    parser.add_argument('--store-dir', default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rank-by', default='Total Profit Ratio (%)',
+                        help="Result column to rank by, e.g. 'Sharpe' or 'Sortino' (default: profit ratio)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    store = PriceStore(args.store_dir) if args.store_dir else PriceStore()
+    initial_investment, jobs = load_jobs(args.job_file)
+    results_df = run_jobs(jobs, initial_investment, store, args.workers, args.rank_by)
+    write_table(results_df, args.output)
+    logger.info("Wrote %d results to %s", len(results_df), args.output)
+
+
+if __name__ == '__main__':
+    main()
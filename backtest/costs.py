@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+FILLS = ('close', 'next_open')
+
+
+@dataclass(frozen=True)
+class ExecutionModel:
+    # How orders fill and what they cost. The default instance is frictionless and reproduces the
+    # original rules exactly (fill at the signal bar's close, whole shares, no fees).
+    commission_fixed: float = 0.0   # per order, in cash
+    commission_bps: float = 0.0     # of the traded value
+    spread_bps: float = 0.0         # full bid/ask spread; buys pay half of it, sells give up half
+    slippage_bps: float = 0.0       # extra adverse price move on every fill
+    fractional: bool = False        # allow fractional share quantities
+    fill: str = 'close'             # 'close' of the signal bar or 'next_open' of the following bar
+
+    def __post_init__(self):
+        if self.fill not in FILLS:
+            raise ValueError(f"Unknown fill {self.fill!r}, expected one of {FILLS}")
+
+    @property
+    def adverse(self):
+        # Fraction a fill moves against us: half the spread plus slippage
+        return (self.spread_bps / 2 + self.slippage_bps) * 1e-4
+
+    @property
+    def charges_commission(self):
+        return self.commission_fixed != 0 or self.commission_bps != 0
+
+    def commission(self, value):
+        return self.commission_fixed + value * (self.commission_bps * 1e-4)
+
+    def budget(self, money):
+        # Largest trade value whose value + commission fits in money
+        if self.commission_fixed:
+            money = np.maximum(money - self.commission_fixed, 0.0)
+        return money / (1 + self.commission_bps * 1e-4)
+
+    def quantity(self, money, price):
+        return money / price if self.fractional else money // price
+
+    def fills(self, signal, open_, close):
+        # Signal bars -> (bar each order fills on, side, buy fill price, sell fill price) as arrays,
+        # so simulation loops only index precomputed per-event prices
+        signal = np.asarray(signal)
+        events = np.flatnonzero((signal == 1) | (signal == -1))
+        if self.fill == 'next_open':
+            if open_ is None:
+                raise ValueError("next_open fills need the Open prices")
+            events = events[events + 1 < len(close)]
+            bars, base = events + 1, np.asarray(open_, dtype=np.float64)[events + 1]
+        else:
+            bars, base = events, np.asarray(close, dtype=np.float64)[events]
+        return bars, signal[events], base * (1 + self.adverse), base * (1 - self.adverse)
+
+    def path_fills(self, signal, open_, close):
+        # (paths x time) counterpart of fills: the side of the order filling on each bar of each path
+        # (0 where none does) and the buy / sell fill prices on every bar
+        signal = np.asarray(signal)
+        sides = np.where((signal == 1) | (signal == -1), signal, 0).astype(np.int8)
+        if self.fill == 'next_open':
+            if open_ is None:
+                raise ValueError("next_open fills need the Open prices")
+            sides = np.concatenate([np.zeros((len(sides), 1), dtype=np.int8), sides[:, :-1]], axis=1)
+            base = np.asarray(open_, dtype=np.float64)
+        else:
+            base = np.asarray(close, dtype=np.float64)
+        return sides, base * (1 + self.adverse), base * (1 - self.adverse)
+
+    def breakout_ror(self, target, close, buy):
+        # Net daily return of a breakout trade: stop buy at the target, sell at the close, both
+        # legs paying the adverse move and the bps commission (fixed fees are handled by compound)
+        buy_price, sell_price = target * (1 + self.adverse), close * (1 - self.adverse)
+        return np.where(buy, (sell_price * (1 - self.commission_bps * 1e-4)) / (buy_price * (1 + self.commission_bps * 1e-4)), 1)
+
+    def compound(self, ror, buy, initial_investment):
+        # Equity of a strategy that reinvests everything: E[t] = E[t-1] * ror[t] - fees[t].
+        # Solved in closed form along the last axis: E = A * (E0 - cumsum(fees / A)), A = cumprod(ror)
+        growth = np.cumprod(ror, axis=-1)
+        if self.commission_fixed == 0:
+            return initial_investment * growth
+        fees = np.where(buy, 2 * self.commission_fixed, 0.0)
+        return growth * (initial_investment - np.cumsum(fees / growth, axis=-1))
+
+
+FRICTIONLESS = ExecutionModel()
@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def minmax_indices(values, n_buckets):
+    # Min/max decimation: split the series into n_buckets equal buckets and keep the
+    # positions of each bucket's minimum and maximum (plus the endpoints), so peaks and
+    # troughs survive at any zoom level. Returns sorted positions into values.
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = values
+    buckets = padded.reshape(n_buckets, size)
+    missing = np.isnan(buckets)
+    lows = np.where(missing, np.inf, buckets).argmin(axis=1)
+    highs = np.where(missing, -np.inf, buckets).argmax(axis=1)
+
+    offsets = np.arange(n_buckets) * size
+    indices = np.concatenate([[0, n - 1], offsets + lows, offsets + highs])
+    return np.unique(indices[indices < n])
@@ -0,0 +1,88 @@
+import numpy as np
+
+from backtest.costs import FRICTIONLESS
+
+
+def apply_signal(side, price, total_money, shares, trade_money, sell_portion, costs=FRICTIONLESS):
+    # One bar of the Bollinger trade rules; returns (total_money, shares, trade_amount, trade_count).
+    # price is the fill price; costs sets the share rounding and the commission taken from cash.
+    # Buy signal
+    if side == 1 and (costs.fractional or trade_money > price) and total_money >= trade_money:
+        shares_bought = costs.quantity(costs.budget(trade_money), price)
+        if shares_bought > 0:
+            cost = shares_bought * price
+            return total_money - (cost + costs.commission(cost)), shares + shares_bought, cost, shares_bought
+
+    # Sell signal
+    elif side == -1 and shares > 0:
+        shares_to_sell = costs.quantity(shares, sell_portion)
+        if shares_to_sell > 0:
+            sell_amount = shares_to_sell * price
+            return total_money + (sell_amount - costs.commission(sell_amount)), shares - shares_to_sell, -sell_amount, shares_to_sell
+
+    return total_money, shares, 0.0, 0
+
+
+# One record per executed trade; shares is signed (+ bought, - sold) and cash/shares_held
+# are the balances right after the trade
+LEDGER_DTYPE = np.dtype([('bar', np.int32), ('shares', np.float64), ('price', np.float64),
+                         ('cash', np.float64), ('shares_held', np.float64)])
+
+
+def simulate_ledger(close, signal, initial_investment, buy_portion, sell_portion, costs=FRICTIONLESS, open_=None):
+    # Bollinger trade loop over the signal bars only; returns the sparse trade ledger.
+    # Bars without a trade carry no state change, so nothing is stored for them.
+    # Fill bars and fill prices come precomputed from the cost model (open_ is needed for
+    # next-open fills), so the loop does the same scalar work with or without costs.
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal)
+    bars, sides, buy_prices, sell_prices = costs.fills(signal, open_, close)
+
+    total_money = initial_investment
+    trade_money = initial_investment // buy_portion
+    shares = 0
+    records = []
+    for bar, side, buy_price, sell_price in zip(bars.tolist(), sides.tolist(), buy_prices.tolist(), sell_prices.tolist()):
+        price = buy_price if side == 1 else sell_price
+        total_money, shares, amount, count = apply_signal(side, price, total_money, shares, trade_money, sell_portion, costs)
+        if count:
+            records.append((bar, count if amount > 0 else -count, price, total_money, shares))
+    return np.array(records, dtype=LEDGER_DTYPE)
+
+
+def _balances(ledger, n, initial_investment):
+    # Cash and shares in effect at every bar = balances after the last trade at or before it
+    state = np.searchsorted(ledger['bar'], np.arange(n), side='right')
+    cash = np.concatenate([[initial_investment], ledger['cash']])[state]
+    shares_held = np.concatenate([[0.0], ledger['shares_held']])[state]
+    return cash, shares_held
+
+
+def equity_curve(ledger, close, initial_investment):
+    close = np.asarray(close, dtype=np.float64)
+    cash, shares_held = _balances(ledger, len(close), initial_investment)
+    return shares_held * close + cash
+
+
+def final_value(ledger, close, initial_investment):
+    shares_held = ledger['shares_held'][-1] if len(ledger) else 0.0
+    cash = ledger['cash'][-1] if len(ledger) else initial_investment
+    return shares_held * float(close[-1]) + cash
+
+
+def expand_ledger(ledger, close, initial_investment):
+    # Dense Trade_Amount / Trade_Count / Shares_held / Portfolio_Value columns, for display
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    trade_amount = np.zeros(n)
+    trade_count = np.zeros(n)
+    trade_amount[ledger['bar']] = ledger['shares'] * ledger['price']
+    trade_count[ledger['bar']] = np.abs(ledger['shares'])
+
+    cash, shares_held = _balances(ledger, n, initial_investment)
+    return trade_amount, trade_count, shares_held, shares_held * close + cash
+
+
+def simulate_trades(close, signal, initial_investment, buy_portion, sell_portion, costs=FRICTIONLESS, open_=None):
+    return expand_ledger(simulate_ledger(close, signal, initial_investment, buy_portion, sell_portion, costs, open_),
+                         close, initial_investment)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+# name -> compute(prices, *args), where prices maps 'Open'/'High'/'Low'/'Close' to float arrays.
+# Pipeline.indicator caches each (name, *args) once per dataset, so strategies and chart columns
+# asking for the same indicator (e.g. SMA_20 and the Bollinger mid band) share one array.
+INDICATORS = {}
+
+
+def register_indicator(name):
+    def register(compute):
+        INDICATORS[name] = compute
+        return compute
+    return register
+
+
+@register_indicator('sma')
+def sma(prices, period):
+    return pd.Series(prices['Close'], dtype=np.float64).rolling(window=period).mean().to_numpy()
+
+
+@register_indicator('rolling_std')
+def rolling_std(prices, period):
+    return pd.Series(prices['Close'], dtype=np.float64).rolling(window=period).std().to_numpy()
+
+
+@register_indicator('prev_range')
+def prev_range(prices):
+    # Previous bar's High - Low along the last (time) axis; NaN on the first bar. Also takes
+    # (rows x time) matrices such as Monte Carlo paths. Every breakout rule reads this one.
+    day_range = np.asarray(prices['High'], dtype=np.float64) - np.asarray(prices['Low'], dtype=np.float64)
+    shifted = np.full(day_range.shape, np.nan)
+    shifted[..., 1:] = day_range[..., :-1]
+    return shifted
@@ -0,0 +1,98 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Active recorder and stage for the current thread; Streamlit runs each session's script in its own thread
+_local = threading.local()
+
+
+class Recorder:
+    # Collects one record per pipeline stage: wall time, rows, cache hits/misses and
+    # (with trace_memory) the traced memory delta. profile='cprofile' or 'pyinstrument'
+    # additionally captures a profile of everything run inside activate().
+    def __init__(self, trace_memory=False, profile=None):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.stages = []
+        self.profile_text = None
+
+    @contextmanager
+    def activate(self):
+        previous = getattr(_local, 'recorder', None)
+        _local.recorder = self
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        profiler = self._start_profiler()
+        try:
+            yield self
+        finally:
+            if profiler is not None:
+                self.profile_text = self._stop_profiler(profiler)
+            if started_tracing:
+                tracemalloc.stop()
+            _local.recorder = previous
+
+    def _start_profiler(self):
+        if self.profile == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        elif self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = None
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        if self.profile == 'pyinstrument':
+            profiler.stop()
+            return profiler.output_text(unicode=True)
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(40)
+        return output.getvalue()
+
+    @contextmanager
+    def stage(self, name, cached=False):
+        record = {'name': name, 'seconds': 0.0, 'rows': None, 'cache_hits': 0, 'cache_misses': 0,
+                  'memory_delta_bytes': None}
+        parent = getattr(_local, 'stage', None)
+        _local.stage = record
+        memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if memory_before is not None:
+                record['memory_delta_bytes'] = tracemalloc.get_traced_memory()[0] - memory_before
+            # For st.cache_data functions the body only runs on a miss, and the body reports it
+            if cached and record['cache_misses'] == 0:
+                record['cache_hits'] += 1
+            _local.stage = parent
+            self.stages.append(record)
+
+    def to_json(self):
+        return json.dumps({'stages': self.stages, 'total_seconds': sum(s['seconds'] for s in self.stages)},
+                          indent=2, default=str)
+
+
+def stage(name, cached=False):
+    # No-op unless a Recorder is active in this thread, so instrumented code costs nothing by default
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        return nullcontext({})
+    return recorder.stage(name, cached)
+
+
+def count_cache(hit):
+    record = getattr(_local, 'stage', None)
+    if record is not None:
+        record['cache_hits' if hit else 'cache_misses'] += 1
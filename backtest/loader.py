@@ -0,0 +1,78 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from functools import partial
+
+from backtest.bars import INTERVALS
+from backtest.store import PriceStore, yahoo_source
+
+WATCHLIST = ["TQQQ", "QQQ", "SOXL", "SOXX", "GOOGL", "MSFT", "AAPL", "NVDA", "AMZN"]
+
+logger = logging.getLogger(__name__)
+
+
+def _refresh_with_retries(store, ticker, start, end, interval, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            return len(store.refresh(ticker, start, end, interval))
+        except Exception:
+            if attempt == retries:
+                raise
+            logger.warning("Fetching %s failed (attempt %d/%d), retrying", ticker, attempt + 1, retries + 1)
+            time.sleep(backoff * 2 ** attempt)
+
+
+def prefetch(tickers, start, end, interval='1d', store=None, max_workers=8, retries=2, backoff=1.0, timeout=30):
+    # Warms the price store for a whole watchlist on a bounded thread pool.
+    # Returns {ticker: row count or the exception that made the last retry fail}.
+    if store is None:
+        store = PriceStore(source=partial(yahoo_source, timeout=timeout))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_refresh_with_retries, store, ticker, start, end, interval, retries, backoff): ticker
+                   for ticker in dict.fromkeys(tickers)}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                results[ticker] = e
+    return results
+
+
+def main(argv=None):
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Prefetch price history for a watchlist into the local price store.")
+    parser.add_argument('tickers', nargs='*', default=WATCHLIST)
+    parser.add_argument('--start', type=date.fromisoformat, default=today - timedelta(days=365 * 10))
+    parser.add_argument('--end', type=date.fromisoformat, default=today)
+    parser.add_argument('--interval', choices=list(INTERVALS), default='1d')
+    parser.add_argument('--store-dir', default=None)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    store = None
+    if args.store_dir:
+        store = PriceStore(args.store_dir, source=partial(yahoo_source, timeout=args.timeout))
+
+    results = prefetch(args.tickers, args.start, args.end, args.interval, store=store, max_workers=args.workers,
+                       retries=args.retries, timeout=args.timeout)
+    failed = 0
+    for ticker in args.tickers:
+        result = results[ticker]
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error("%-6s failed: %s", ticker, result)
+        else:
+            logger.info("%-6s %d bars", ticker, result)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+import numpy as np
+
+from backtest.engine import _balances
+
+TRADING_DAYS = 252
+BARS_PER_DAY = {'1m': 390, '5m': 78, '15m': 26, '1h': 7, '1d': 1}
+
+
+def periods_per_year(interval='1d'):
+    return TRADING_DAYS * BARS_PER_DAY[interval]
+
+
+def equity_metrics(equity, periods_per_year=TRADING_DAYS, risk_free=0.0):
+    # Return and risk metrics of one equity curve, or of every row of a (runs x time) array,
+    # from one set of reductions over the per-bar returns and the running peak.
+    # risk_free is an annual rate; Sharpe/Sortino use the per-bar excess return.
+    equity = np.asarray(equity, dtype=np.float64)
+    bars = np.arange(equity.shape[-1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(equity, axis=-1) / equity[..., :-1]
+        excess = returns - risk_free / periods_per_year
+        mean, std = excess.mean(axis=-1), returns.std(axis=-1, ddof=1)
+        downside = np.sqrt((np.minimum(excess, 0) ** 2).mean(axis=-1))
+        years = returns.shape[-1] / periods_per_year
+
+        drawdown = equity / np.maximum.accumulate(equity, axis=-1) - 1
+        last_peak = np.maximum.accumulate(np.where(drawdown == 0, bars, 0), axis=-1)
+        return {
+            'CAGR (%)': ((equity[..., -1] / equity[..., 0]) ** (1 / years) - 1) * 100,
+            'Volatility (%)': std * np.sqrt(periods_per_year) * 100,
+            'Sharpe': mean / std * np.sqrt(periods_per_year),
+            'Sortino': mean / downside * np.sqrt(periods_per_year),
+            'Max Drawdown (%)': drawdown.min(axis=-1) * 100,
+            'Max Drawdown Duration': (bars - last_peak).max(axis=-1),
+        }
+
+
+def ledger_metrics(ledger, close, initial_investment, equity):
+    # Win rate = share of sells above the average cost of the shares held, exposure = share of
+    # bars holding shares, turnover = traded value / average equity. The average cost walk only
+    # visits the ledger rows, which are few compared with the bars.
+    _, shares_held = _balances(ledger, len(close), initial_investment)
+    wins = sells = 0
+    cost = held = 0.0
+    for shares, price in zip(ledger['shares'].tolist(), ledger['price'].tolist()):
+        if shares > 0:
+            cost += shares * price
+            held += shares
+        else:
+            average_cost = cost / held
+            wins += price > average_cost
+            sells += 1
+            cost -= average_cost * -shares
+            held += shares
+    return {
+        'Win Rate (%)': wins / sells * 100 if sells else np.nan,
+        'Exposure (%)': (shares_held > 0).mean() * 100,
+        'Turnover': np.abs(ledger['shares'] * ledger['price']).sum() / np.mean(equity),
+    }
+
+
+def breakout_trade_metrics(buy, ror):
+    # Every breakout day buys at the target with the whole balance and sells at the close
+    buy = np.asarray(buy, dtype=bool)
+    return {
+        'Win Rate (%)': (np.asarray(ror)[buy] > 1).mean() * 100 if buy.any() else np.nan,
+        'Exposure (%)': buy.mean() * 100,
+        'Turnover': 2.0 * buy.sum(),
+    }
+
+
+def performance_metrics(equity, initial_investment, trade_metrics=None, periods_per_year=TRADING_DAYS):
+    final_portfolio_value = float(equity[-1])
+    metrics = {'Final Portfolio Value': final_portfolio_value,
+               'Total Profit Ratio (%)': (final_portfolio_value - initial_investment) / initial_investment * 100}
+    metrics.update({name: float(value) for name, value in equity_metrics(equity, periods_per_year).items()})
+    metrics.update(trade_metrics or {})
+    return metrics
+
+
+def format_metrics(metrics):
+    return ' · '.join([
+        f"CAGR {metrics['CAGR (%)']:.2f}%",
+        f"Volatility {metrics['Volatility (%)']:.2f}%",
+        f"Sharpe {metrics['Sharpe']:.2f}",
+        f"Sortino {metrics['Sortino']:.2f}",
+        f"Max Drawdown {metrics['Max Drawdown (%)']:.2f}% ({metrics['Max Drawdown Duration']:.0f} bars)",
+        f"Win Rate {metrics['Win Rate (%)']:.1f}%",
+        f"Exposure {metrics['Exposure (%)']:.1f}%",
+        f"Turnover {metrics['Turnover']:.2f}x",
+    ])
@@ -0,0 +1,143 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from backtest.costs import FRICTIONLESS
+from backtest.metrics import TRADING_DAYS, equity_metrics
+from backtest.strategies import bollinger_signals
+from backtest.sweep import breakout_equity, sweep_equity
+from backtest.tables import to_arrow, to_pandas
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+BOLLINGER = 'Bollinger Bands'
+BREAKOUT = 'Volatility Breakout'
+
+# Set in each worker by _init_worker: (SharedMemory, prices view of shape (4, total_bars))
+_shared = None
+
+
+def _init_worker(shm_name, shape):
+    global _shared
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _shared = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+
+
+def _run_task(task):
+    ticker, start_date, end_date, start, stop, strategy, params, initial_investment, periods_per_year, costs = task
+    # Returns one Arrow table per task, built column by column from the sweep arrays
+    open_, high, low, close = _shared[1][:, start:stop]
+    if stop - start == 0:
+        return pa.table({})
+
+    if strategy == BOLLINGER:
+        signal = bollinger_signals(close)
+        buy_portions, sell_portions = params['buy_portions'], params['sell_portions']
+        equity = sweep_equity(close, signal, initial_investment, buy_portions, sell_portions, costs, open_)
+        buy_grid, sell_grid = np.meshgrid(buy_portions, sell_portions, indexing='ij')
+        param_columns = {'Buy Portion': buy_grid.ravel(), 'Sell Portion': sell_grid.ravel()}
+    else:
+        breakout_multipliers = params['breakout_multipliers']
+        equity = breakout_equity(open_, high, low, close, breakout_multipliers, initial_investment, costs)
+        param_columns = {'Magic Number(k)': np.asarray(breakout_multipliers, dtype=np.float64)}
+
+    # One row of equity per parameter set, in the same order as param_columns
+    count = len(equity)
+    final_values = equity[:, -1]
+    columns = {'Ticker': [ticker] * count, 'Start Date': [start_date] * count, 'End Date': [end_date] * count,
+               'Strategy': [strategy] * count, **param_columns,
+               'Final Portfolio Value': final_values,
+               'Total Profit Ratio (%)': (final_values - initial_investment) / initial_investment * 100,
+               **equity_metrics(equity, periods_per_year)}
+    return pa.table(columns)
+
+
+class OptimizationPool:
+    # One worker process pool and one shared price block for a set of tickers, both created on the first
+    # run() and reused by every later one, e.g. one background job chunk per ticker; close() releases them.
+    def __init__(self, price_data, max_workers=None):
+        self.price_data = {ticker: stock_data.sort_index() for ticker, stock_data in price_data.items()}
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._shm = None
+        self._executor = None
+        self._offsets = {}
+
+    def _start(self):
+        with self._lock:
+            if self._executor is not None:
+                return
+            tickers = list(self.price_data)
+            lengths = [len(self.price_data[ticker]) for ticker in tickers]
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            shape = (len(PRICE_COLUMNS), max(int(offsets[-1]), 1))
+
+            # All tickers live side by side in one shared block; workers only receive index ranges
+            self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+            prices = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+            for ticker, offset in zip(tickers, offsets):
+                stock_data = self.price_data[ticker]
+                for row, column in enumerate(PRICE_COLUMNS):
+                    prices[row, offset:offset + len(stock_data)] = stock_data[column].to_numpy(dtype=np.float64).reshape(-1)
+                self._offsets[ticker] = int(offset)
+
+            # Forking from a background thread (Streamlit, BacktestService workers) can copy a lock held by
+            # another thread into the worker and deadlock it, so those callers start workers from a forkserver
+            mp_context = None if threading.current_thread() is threading.main_thread() else multiprocessing.get_context('forkserver')
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context, initializer=_init_worker,
+                                                 initargs=(self._shm.name, shape))
+
+    def run(self, tickers, date_windows, strategy_params, initial_investment, periods_per_year=TRADING_DAYS, costs=FRICTIONLESS):
+        # Yields an Arrow table of result rows as soon as each (ticker, window, strategy) task finishes
+        self._start()
+        tasks = []
+        for ticker in tickers:
+            offset, dates = self._offsets[ticker], self.price_data[ticker].index
+            for start_date, end_date in date_windows:
+                start = offset + dates.searchsorted(pd.Timestamp(start_date), side='left')
+                stop = offset + dates.searchsorted(pd.Timestamp(end_date), side='right')
+                for strategy, params in strategy_params.items():
+                    tasks.append((ticker, start_date, end_date, int(start), int(stop), strategy, params, initial_investment, periods_per_year, costs))
+        futures = [self._executor.submit(_run_task, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._shm.close()
+            self._shm.unlink()
+            self._executor = self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_optimization(price_data, date_windows, strategy_params, initial_investment, max_workers=None, periods_per_year=TRADING_DAYS,
+                     costs=FRICTIONLESS):
+    # price_data: {ticker: DataFrame with Open/High/Low/Close and a DatetimeIndex}
+    # date_windows: [(start_date, end_date), ...]
+    # strategy_params: {BOLLINGER: {'buy_portions': ..., 'sell_portions': ...},
+    #                   BREAKOUT: {'breakout_multipliers': ...}}
+    # Yields an Arrow table of result rows as soon as each (ticker, window, strategy) task finishes.
+    with OptimizationPool(price_data, max_workers) as pool:
+        yield from pool.run(list(price_data), date_windows, strategy_params, initial_investment, periods_per_year, costs)
+
+
+def rank_results(results, by='Total Profit Ratio (%)'):
+    # Ranked by profit ratio (or a risk-adjusted column such as 'Sharpe') so results stay
+    # comparable across tickers and windows. results: a DataFrame, row dicts or run_optimization tables
+    results_df = pd.DataFrame(results) if isinstance(results, pd.DataFrame) else to_pandas(to_arrow(results))
+    if results_df.empty:
+        return results_df
+    results_df['Profit Ranking'] = results_df[by].rank(ascending=False, method='min', na_option='bottom').astype(int)
+    return results_df.sort_values(by='Profit Ranking').reset_index(drop=True)
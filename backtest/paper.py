@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backtest.bars import INTERVALS
+from backtest.loader import WATCHLIST
+from backtest.store import PriceStore
+from backtest.streaming import BollingerStream, BreakoutStream
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Bar:
+    ticker: str
+    time: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float = 0.0
+    # perf_counter() when the source handed the bar over; decision latency is measured from here
+    received: float = field(default_factory=time.perf_counter)
+
+
+class ReplaySource:
+    # Stand-in feed for testing: replays stored frames in timestamp order across all tickers,
+    # optionally sleeping delay seconds between timestamps to imitate a live pace.
+    # Any object with an async subscribe(tickers) generator of Bars can replace it.
+    def __init__(self, price_data, delay=0.0):
+        self.price_data = price_data
+        self.delay = delay
+
+    async def subscribe(self, tickers):
+        frames = [self.price_data[ticker].assign(Ticker=ticker) for ticker in tickers if ticker in self.price_data]
+        if not frames:
+            return
+        merged = pd.concat(frames).sort_index(kind='stable')
+        times = merged.index
+        columns = [merged[column].to_numpy(dtype=np.float64) for column in ('Open', 'High', 'Low', 'Close')]
+        volume = merged['Volume'].to_numpy(dtype=np.float64) if 'Volume' in merged else np.zeros(len(merged))
+        ticker_column = merged['Ticker'].to_numpy()
+
+        for i in range(len(merged)):
+            if i and times[i] != times[i - 1]:
+                # New timestamp: let the strategy tasks catch up before the next batch of bars
+                await asyncio.sleep(self.delay)
+            yield Bar(ticker_column[i], times[i], columns[0][i], columns[1][i], columns[2][i], columns[3][i], volume[i])
+
+
+class PollingSource:
+    # Live feed on top of the price store: every poll_seconds it refreshes each ticker (in a worker
+    # thread, so the event loop keeps running) and emits the closed bars it has not emitted yet.
+    # Build the store with refresh_ttl <= poll_seconds so the latest bar is actually re-fetched.
+    def __init__(self, store, interval='1m', poll_seconds=60, lookback=timedelta(days=1)):
+        self.store = store
+        self.interval = interval
+        self.poll_seconds = poll_seconds
+        self.lookback = lookback
+
+    def closed_bars(self, stock_data, now=None):
+        # The last bar keeps changing until its interval has passed, and the strategy streams can't take
+        # a bar back, so it is held until it closes (or a newer bar shows it has). The store keeps bar
+        # times as naive UTC, so they are compared with the UTC clock rather than the host's local time.
+        if stock_data.empty:
+            return stock_data
+        last = stock_data.index[-1]
+        if last.tz is not None:
+            last = last.tz_convert('UTC').tz_localize(None)
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None) if now is None else now
+        return stock_data.iloc[:-1] if last + INTERVALS[self.interval][0] > now else stock_data
+
+    async def subscribe(self, tickers):
+        last_seen = {}
+        while True:
+            end = date.today() + timedelta(days=1)
+            for ticker in tickers:
+                try:
+                    stock_data = await asyncio.to_thread(self.store.get, ticker, end - self.lookback, end, self.interval)
+                except Exception:
+                    logger.exception("Polling %s failed", ticker)
+                    continue
+                stock_data = self.closed_bars(stock_data)
+                if ticker in last_seen:
+                    stock_data = stock_data[stock_data.index > last_seen[ticker]]
+                for row in stock_data.itertuples():
+                    yield Bar(ticker, row.Index, row.Open, row.High, row.Low, row.Close, getattr(row, 'Volume', 0.0))
+                if len(stock_data):
+                    last_seen[ticker] = stock_data.index[-1]
+            await asyncio.sleep(self.poll_seconds)
+
+
+class StrategyRunner:
+    # One strategy on one ticker: feeds bars into its incremental stream, keeps the simulated
+    # position and records bar-to-decision latency
+    def __init__(self, ticker, strategy, initial_investment, params=None, latency_window=10000):
+        params = params or {}
+        self.ticker = ticker
+        self.strategy = strategy
+        self.initial_investment = initial_investment
+        if strategy == 'bollinger':
+            self.stream = BollingerStream(initial_investment, params.get('buy_portion', 5), params.get('sell_portion', 4))
+        elif strategy == 'breakout':
+            self.stream = BreakoutStream(initial_investment, params.get('breakout_multiplier', 0.4))
+        else:
+            raise ValueError(f"Unknown strategy {strategy!r}, expected 'bollinger' or 'breakout'")
+        self.bars = 0
+        self.last = {}
+        self.latencies = deque(maxlen=latency_window)
+
+    def on_bar(self, bar):
+        # Returns a decision dict when the bar produced a (simulated) fill, otherwise None
+        if self.strategy == 'bollinger':
+            self.last = self.stream.update(bar.close)
+            decision = None
+            if self.last['Trade_Count']:
+                decision = {'Action': 'Buy' if self.last['Signal'] == 1 else 'Sell',
+                            'Shares': self.last['Trade_Count'], 'Price': bar.close}
+        else:
+            self.last = self.stream.update(bar.open, bar.high, bar.low, bar.close)
+            decision = None
+            if self.last['Buy']:
+                # Whole balance in at the target, out at the close
+                shares = self.last['Portfolio_Value'] / self.last['ror'] / self.last['Target']
+                decision = {'Action': 'Breakout', 'Shares': shares, 'Price': self.last['Target']}
+        self.bars += 1
+        self.latencies.append(time.perf_counter() - bar.received)
+        if decision is not None:
+            decision = {'Time': bar.time, 'Ticker': self.ticker, 'Strategy': self.strategy, **decision}
+        return decision
+
+    def latency_ms(self):
+        if not self.latencies:
+            return {'Latency p50 (ms)': np.nan, 'Latency p99 (ms)': np.nan, 'Latency max (ms)': np.nan}
+        latencies = np.fromiter(self.latencies, dtype=np.float64) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99])
+        return {'Latency p50 (ms)': p50, 'Latency p99 (ms)': p99, 'Latency max (ms)': latencies.max()}
+
+    def position(self):
+        if self.strategy == 'bollinger':
+            shares, cash = self.stream.shares, self.stream.total_money
+        else:
+            # Breakout trades are closed at the same bar's close, so it never carries shares
+            shares, cash = 0, self.last.get('Portfolio_Value', self.initial_investment)
+        return {'Ticker': self.ticker, 'Strategy': self.strategy, 'Bars': self.bars,
+                'Shares_held': shares, 'Cash': cash,
+                'Portfolio_Value': self.last.get('Portfolio_Value', self.initial_investment),
+                **self.latency_ms()}
+
+
+class PaperTrader:
+    # Runs many (ticker, strategy) runners in one event loop. One task reads the source and routes
+    # every bar to its ticker's queue; one task per ticker applies all of that ticker's strategies,
+    # so a slow ticker never blocks the feed or the others.
+    def __init__(self, source, runners, queue_size=1000, max_decisions=10000):
+        self.source = source
+        self.runners = defaultdict(list)
+        for runner in runners:
+            self.runners[runner.ticker].append(runner)
+        self.queue_size = queue_size
+        self.decisions = deque(maxlen=max_decisions)
+
+    async def _feed(self, queues):
+        try:
+            async for bar in self.source.subscribe(list(queues)):
+                if bar.ticker in queues:
+                    await queues[bar.ticker].put(bar)
+        finally:
+            for queue in queues.values():
+                await queue.put(None)
+
+    async def _trade(self, ticker, queue):
+        while (bar := await queue.get()) is not None:
+            for runner in self.runners[ticker]:
+                decision = runner.on_bar(bar)
+                if decision is not None:
+                    self.decisions.append(decision)
+                    logger.debug("%s", decision)
+
+    async def run(self):
+        # Returns when the source is exhausted (a replay) or the task is cancelled (a live feed)
+        queues = {ticker: asyncio.Queue(self.queue_size) for ticker in self.runners}
+        await asyncio.gather(self._feed(queues), *(self._trade(ticker, queue) for ticker, queue in queues.items()))
+
+    def snapshot(self):
+        return pd.DataFrame([runner.position() for runners in self.runners.values() for runner in runners])
+
+    def decision_log(self):
+        return pd.DataFrame(list(self.decisions))
+
+
+def main(argv=None):
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Paper-trade the Bollinger and breakout rules on a replayed or polled bar feed.")
+    parser.add_argument('tickers', nargs='*', default=WATCHLIST)
+    parser.add_argument('--strategies', nargs='+', choices=['bollinger', 'breakout'], default=['bollinger', 'breakout'])
+    parser.add_argument('--start', type=date.fromisoformat, default=today - timedelta(days=365))
+    parser.add_argument('--end', type=date.fromisoformat, default=today)
+    parser.add_argument('--interval', choices=list(INTERVALS), default='1d')
+    parser.add_argument('--initial-investment', type=float, default=1500000)
+    parser.add_argument('--delay', type=float, default=0.0, help="Seconds between replayed timestamps")
+    parser.add_argument('--live', action='store_true', help="Poll the price store for new bars instead of replaying")
+    parser.add_argument('--poll-seconds', type=float, default=60)
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    kwargs = {'refresh_ttl': args.poll_seconds} if args.live else {}
+    store = PriceStore(args.store_dir, **kwargs) if args.store_dir else PriceStore(**kwargs)
+    if args.live:
+        source = PollingSource(store, args.interval, args.poll_seconds)
+    else:
+        source = ReplaySource({ticker: store.get(ticker, args.start, args.end, args.interval) for ticker in args.tickers},
+                              args.delay)
+
+    runners = [StrategyRunner(ticker, strategy, args.initial_investment) for ticker in args.tickers for strategy in args.strategies]
+    trader = PaperTrader(source, runners)
+    started = datetime.now()
+    try:
+        asyncio.run(trader.run())
+    except KeyboardInterrupt:
+        pass
+    logger.info("%d decisions in %s", len(trader.decisions), datetime.now() - started)
+    logger.info("%s", trader.snapshot().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
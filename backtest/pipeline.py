@@ -0,0 +1,153 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.engine import equity_curve, simulate_ledger
+from backtest.indicators import INDICATORS
+from backtest.instrument import count_cache
+from backtest.metrics import TRADING_DAYS, breakout_trade_metrics, ledger_metrics, performance_metrics
+from backtest.strategies import band_signals, breakout_columns
+from backtest.sweep import sweep_breakout
+
+
+def data_fingerprint(stock_data, columns=('Open', 'High', 'Low', 'Close')):
+    # Content hash of the price frame: dates plus the OHLC values a strategy reads, so a refreshed
+    # download with a new bar (or a corrected price) gets a new key and everything downstream
+    # recomputes, while frames that differ only in unused columns share cached nodes
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(stock_data.index.asi8.tobytes() if isinstance(stock_data.index, pd.DatetimeIndex)
+                  else pd.util.hash_pandas_object(stock_data.index).to_numpy().tobytes())
+    for column in columns:
+        if column in stock_data:
+            digest.update(np.ascontiguousarray(stock_data[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def fill_key(costs, open_):
+    # Next-open fills also read Open, which a Close-only data key doesn't cover
+    if costs.fill != 'next_open' or open_ is None:
+        return None
+    return hashlib.blake2b(np.ascontiguousarray(open_, dtype=np.float64).tobytes(), digest_size=16).hexdigest()
+
+
+def _freeze(value):
+    # Cached results are shared between reruns and sessions, so hand them out read-only
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _freeze(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    return value
+
+
+class Pipeline:
+    # Small computation graph: prices -> SMA set / bands -> signals -> trades -> metrics.
+    # Every node is cached under (node name, data fingerprint, parameters), so changing one
+    # sidebar option only recomputes the nodes that depend on it.
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def node(self, key, compute):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                count_cache(hit=True)
+                return self._cache[key]
+            self.misses += 1
+        count_cache(hit=False)
+
+        value = _freeze(compute())
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def indicator(self, data_key, prices, name, *args):
+        # Any registered indicator, computed once per (dataset, name, args) whoever asks for it
+        return self.node(('indicator', data_key, name) + args, lambda: INDICATORS[name](prices, *args))
+
+    def moving_average(self, data_key, close, period):
+        return self.indicator(data_key, {'Close': close}, 'sma', period)
+
+    def prev_range(self, data_key, high, low):
+        # Shared by the breakout columns, metrics and sweep nodes and the breakout plugin
+        return self.indicator(data_key, {'High': high, 'Low': low}, 'prev_range')
+
+    def bollinger_bands(self, data_key, close, window=20, num_std=2):
+        # The mid band is the same cached SMA the moving-average columns use
+        def compute():
+            rolling_mean = self.moving_average(data_key, close, window)
+            rolling_std = self.indicator(data_key, {'Close': close}, 'rolling_std', window)
+            return rolling_mean, rolling_mean + (rolling_std * num_std), rolling_mean - (rolling_std * num_std)
+        return self.node(('bands', data_key, window, num_std), compute)
+
+    def signals(self, data_key, close, window=20):
+        def compute():
+            _, upper, lower = self.bollinger_bands(data_key, close, window)
+            return band_signals(close, upper, lower)
+        return self.node(('signals', data_key, window), compute)
+
+    def trades(self, data_key, close, initial_investment, buy_portion, sell_portion, window=20, costs=FRICTIONLESS, open_=None):
+        # Only the sparse trade ledger is cached; dense columns are rebuilt with expand_ledger on demand.
+        # data_key may cover Close only, so next-open fills add a digest of open_ to the key.
+        return self.node(('trades', data_key, fill_key(costs, open_), window, initial_investment, buy_portion, sell_portion, costs),
+                         lambda: simulate_ledger(close, self.signals(data_key, close, window),
+                                                 initial_investment, buy_portion, sell_portion, costs, open_))
+
+    def performance(self, data_key, close, initial_investment, buy_portion, sell_portion, periods_per_year=TRADING_DAYS, window=20,
+                    costs=FRICTIONLESS, open_=None):
+        # Full metrics set from the cached ledger: one equity curve plus one walk over the trades
+        def compute():
+            ledger = self.trades(data_key, close, initial_investment, buy_portion, sell_portion, window, costs, open_)
+            equity = equity_curve(ledger, close, initial_investment)
+            return performance_metrics(equity, initial_investment, ledger_metrics(ledger, close, initial_investment, equity), periods_per_year)
+        return self.node(('performance', data_key, fill_key(costs, open_), window, initial_investment, buy_portion, sell_portion, periods_per_year, costs), compute)
+
+    def breakout(self, data_key, open_, high, low, close, breakout_multiplier, costs=FRICTIONLESS):
+        return self.node(('breakout', data_key, breakout_multiplier, costs),
+                         lambda: breakout_columns(open_, high, low, close, breakout_multiplier, costs,
+                                                  self.prev_range(data_key, high, low)))
+
+    def breakout_metrics(self, data_key, open_, high, low, close, breakout_multiplier, initial_investment, costs=FRICTIONLESS):
+        def compute():
+            # Sweeps only need the final value, so the dense breakout columns are not cached here
+            columns = breakout_columns(open_, high, low, close, breakout_multiplier, costs, self.prev_range(data_key, high, low))
+            final_portfolio_value = costs.compound(columns['ror'], columns['Buy'], initial_investment)[-1]
+            return final_portfolio_value, (final_portfolio_value - initial_investment) / initial_investment * 100
+        return self.node(('breakout_metrics', data_key, breakout_multiplier, initial_investment, costs), compute)
+
+    def breakout_performance(self, data_key, open_, high, low, close, breakout_multiplier, initial_investment, periods_per_year=TRADING_DAYS,
+                             costs=FRICTIONLESS):
+        def compute():
+            columns = self.breakout(data_key, open_, high, low, close, breakout_multiplier, costs)
+            return performance_metrics(costs.compound(columns['ror'], columns['Buy'], initial_investment), initial_investment,
+                                       breakout_trade_metrics(columns['Buy'], columns['ror']), periods_per_year)
+        return self.node(('breakout_performance', data_key, breakout_multiplier, initial_investment, periods_per_year, costs), compute)
+
+    def breakout_sweep(self, data_key, open_, high, low, close, breakout_multipliers, initial_investment, costs=FRICTIONLESS):
+        # Final portfolio value for every k, evaluated as one (k x time) array operation
+        breakout_multipliers = tuple(float(k) for k in breakout_multipliers)
+        return self.node(('breakout_sweep', data_key, breakout_multipliers, initial_investment, costs),
+                         lambda: sweep_breakout(open_, high, low, close, breakout_multipliers, costs=costs, initial_investment=initial_investment,
+                                                prev_range=self.prev_range(data_key, high, low)) * initial_investment)
+
+
+# Shared by every caller in the process (both Streamlit apps and the CLI)
+default_pipeline = Pipeline()
@@ -0,0 +1,106 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.engine import equity_curve, simulate_ledger
+from backtest.metrics import TRADING_DAYS, performance_metrics
+from backtest.optimizer import BOLLINGER, BREAKOUT
+from backtest.pipeline import data_fingerprint, default_pipeline
+from backtest.strategies import band_signals
+from backtest.sweep import breakout_buys, breakout_equity
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close')
+
+
+class StrategyPlugin(ABC):
+    # A strategy declares the indicators it reads as (name, *args) specs from backtest.indicators
+    # and turns their arrays into a signal array (1 = buy, -1 = sell, 0 = hold); equity turns
+    # that signal into a portfolio value per bar. Indicators are served by Pipeline.indicator,
+    # so strategies run side by side on one dataset compute each distinct indicator once.
+    name = None
+    label = None
+    defaults = {}
+
+    def indicators(self, params):
+        return []
+
+    @abstractmethod
+    def signals(self, prices, values, params):
+        pass
+
+    @abstractmethod
+    def equity(self, prices, signal, values, params, initial_investment, costs=FRICTIONLESS):
+        pass
+
+
+class BollingerPlugin(StrategyPlugin):
+    name = 'bollinger'
+    label = BOLLINGER
+    defaults = {'buy_portion': 5, 'sell_portion': 4, 'window': 20, 'num_std': 2}
+
+    def indicators(self, params):
+        return [('sma', params['window']), ('rolling_std', params['window'])]
+
+    def signals(self, prices, values, params):
+        rolling_mean, rolling_std = values
+        return band_signals(prices['Close'], rolling_mean + rolling_std * params['num_std'],
+                            rolling_mean - rolling_std * params['num_std'])
+
+    def equity(self, prices, signal, values, params, initial_investment, costs=FRICTIONLESS):
+        ledger = simulate_ledger(prices['Close'], signal, initial_investment, params['buy_portion'], params['sell_portion'],
+                                 costs, prices.get('Open'))
+        return equity_curve(ledger, prices['Close'], initial_investment)
+
+
+class BreakoutPlugin(StrategyPlugin):
+    name = 'breakout'
+    label = BREAKOUT
+    defaults = {'breakout_multiplier': 0.4}
+
+    def indicators(self, params):
+        return [('prev_range',)]
+
+    def signals(self, prices, values, params):
+        # 1 on the bars where the high breaks the target; the trade is closed at the same close
+        return breakout_buys(prices['Open'], prices['High'], prices['Low'], [params['breakout_multiplier']], values[0])[0].astype(np.int8)
+
+    def equity(self, prices, signal, values, params, initial_investment, costs=FRICTIONLESS):
+        # The single-k lane of the breakout sweep
+        return breakout_equity(prices['Open'], prices['High'], prices['Low'], prices['Close'], [params['breakout_multiplier']],
+                               initial_investment, costs, values[0])[0]
+
+
+# name -> plugin instance; register_strategy(MyPlugin()) makes a new strategy available to run_strategies
+STRATEGY_PLUGINS = {}
+
+
+def register_strategy(plugin):
+    STRATEGY_PLUGINS[plugin.name] = plugin
+    return plugin
+
+
+register_strategy(BollingerPlugin())
+register_strategy(BreakoutPlugin())
+
+
+def run_strategies(stock_data, runs, initial_investment, pipeline=default_pipeline, costs=FRICTIONLESS, periods_per_year=TRADING_DAYS):
+    # runs: [(plugin name, params), ...]; params missing from a run fall back to the plugin defaults.
+    # Returns (one metrics row per run, DataFrame of equity curves with one column per run).
+    stock_data = stock_data.sort_index()
+    data_key = data_fingerprint(stock_data)
+    prices = {column: stock_data[column].to_numpy(dtype=np.float64).reshape(-1) for column in PRICE_COLUMNS if column in stock_data}
+
+    rows, curves = [], {}
+    for name, params in runs:
+        plugin = STRATEGY_PLUGINS[name]
+        params = {**plugin.defaults, **params}
+        values = [pipeline.indicator(data_key, prices, *spec) for spec in plugin.indicators(params)]
+        signal = plugin.signals(prices, values, params)
+        equity = plugin.equity(prices, signal, values, params, initial_investment, costs)
+        label = f"{plugin.label} ({', '.join(f'{key}={value}' for key, value in params.items())})"
+        rows.append({'Run': label, 'Strategy': plugin.label, **params,
+                     **performance_metrics(equity, initial_investment, periods_per_year=periods_per_year)})
+        curves[label] = equity
+    return pd.DataFrame(rows), pd.DataFrame(curves, index=stock_data.index)
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+from backtest.indicators import INDICATORS
+from backtest.strategies import bollinger_bands, band_signals
+
+ALLOCATIONS = ('equal', 'inverse_volatility')
+PORTFOLIO_LEDGER_DTYPE = np.dtype([('bar', np.int32), ('asset', np.int32), ('shares', np.float64), ('price', np.float64)])
+
+
+def align_prices(price_data, columns=('Open', 'High', 'Low', 'Close')):
+    # Puts every ticker on the union of all dates: returns (dates, tickers, {column: (time x assets) matrix}).
+    # Bars where a ticker has no data are NaN, so no signal fires there.
+    tickers = list(price_data)
+    if not tickers:
+        raise ValueError("No price data to align: the universe is empty")
+    matrices = {}
+    dates = None
+    for column in columns:
+        frame = pd.concat({ticker: price_data[ticker][column] for ticker in tickers}, axis=1).sort_index()
+        dates = frame.index
+        matrices[column] = np.ascontiguousarray(frame.to_numpy(dtype=np.float64))
+    return dates, tickers, matrices
+
+
+def allocation_weights(close, allocation, window=20, lag=0):
+    # Relative weight of each asset when a bar's budget is split between several buys. lag=1 sizes
+    # bar t from returns up to t-1, for entries that fill before bar t's close exists.
+    if allocation == 'equal':
+        return np.ones_like(close)
+    if allocation == 'inverse_volatility':
+        volatility = pd.DataFrame(close).pct_change().rolling(window=window).std().shift(lag).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = 1 / volatility
+        return np.where(np.isfinite(weights), weights, 0.0)
+    raise ValueError(f"Unknown allocation {allocation!r}, expected one of {ALLOCATIONS}")
+
+
+def bollinger_portfolio(price_data, initial_investment, buy_portion, sell_portion, allocation='equal',
+                        max_weight=1.0, rebalance_every=0, window=20):
+    # Bollinger rules on many tickers against one cash balance. Each bar, sells are filled first
+    # (shares // sell_portion of each signalled holding), then the single-ticker trade amount,
+    # initial_investment // buy_portion, is split between the buy signals by the allocation rule
+    # whenever the cash still covers it. With one ticker this is simulate_trades. No position may
+    # grow beyond max_weight of equity, and every rebalance_every bars positions above it are trimmed back.
+    dates, tickers, matrices = align_prices(price_data, columns=('Close',))
+    close = matrices['Close']
+    _, upper, lower = bollinger_bands(close, window)
+    signal = band_signals(close, upper, lower)
+    weights = allocation_weights(close, allocation, window)
+    last_price = pd.DataFrame(close).ffill().fillna(0.0).to_numpy()
+
+    n_bars, n_assets = close.shape
+    trade_money = initial_investment // buy_portion
+    cash = float(initial_investment)
+    shares = np.zeros(n_assets)
+    cash_curve = np.empty(n_bars)
+    equity_curve = np.empty(n_bars)
+    trades = []
+
+    for t in range(n_bars):
+        price = close[t]
+        valid = np.isfinite(price) & (price > 0)
+
+        # Sell signals
+        to_sell = np.where((signal[t] == -1) & valid & (shares > 0), shares // sell_portion, 0.0)
+
+        # Periodic rebalance: trim positions above max_weight of equity
+        if rebalance_every and t % rebalance_every == 0 and max_weight < 1:
+            equity = cash + shares @ last_price[t]
+            excess = np.where(valid, (shares - to_sell) * last_price[t] - max_weight * equity, 0.0)
+            to_sell += np.where(excess > 0, np.ceil(excess / np.where(valid, price, 1.0)), 0.0)
+            to_sell = np.minimum(to_sell, shares)
+
+        if to_sell.any():
+            sold = np.flatnonzero(to_sell)
+            cash += to_sell[sold] @ price[sold]
+            shares[sold] -= to_sell[sold]
+            trades.append((t, sold, -to_sell[sold], price[sold]))
+
+        # Buy signals, sharing one trade amount
+        buying = (signal[t] == 1) & valid
+        if buying.any() and cash >= trade_money:
+            equity = cash + shares @ last_price[t]
+            raw = np.where(buying, weights[t], 0.0)
+            if raw.sum() == 0:
+                raw = buying.astype(float)
+            budget = trade_money * raw / raw.sum()
+            headroom = np.maximum(max_weight * equity - shares * last_price[t], 0.0)
+            budget = np.minimum(budget, headroom)
+            to_buy = np.where(buying, budget // np.where(valid, price, np.inf), 0.0)
+            if to_buy.any():
+                bought = np.flatnonzero(to_buy)
+                cash -= to_buy[bought] @ price[bought]
+                shares[bought] += to_buy[bought]
+                trades.append((t, bought, to_buy[bought], price[bought]))
+
+        cash_curve[t] = cash
+        equity_curve[t] = cash + shares @ last_price[t]
+
+    ledger = np.zeros(sum(len(assets) for _, assets, _, _ in trades), dtype=PORTFOLIO_LEDGER_DTYPE)
+    position = 0
+    for t, assets, traded, prices in trades:
+        rows = slice(position, position + len(assets))
+        ledger['bar'][rows], ledger['asset'][rows] = t, assets
+        ledger['shares'][rows], ledger['price'][rows] = traded, prices
+        position += len(assets)
+
+    summary = pd.DataFrame({'Cash': cash_curve, 'Positions_Value': equity_curve - cash_curve,
+                            'Portfolio_Value': equity_curve}, index=dates)
+    return summary, ledger, tickers
+
+
+def breakout_portfolio(price_data, initial_investment, breakout_multiplier, allocation='equal', max_weight=1.0, window=20):
+    # Volatility breakout on many tickers with one cash balance. Each day the cash is split between
+    # the tickers whose high broke their target (capped at max_weight each, the rest stays in cash);
+    # positions are bought at the target and sold at the close, so the whole run is matrix algebra.
+    dates, tickers, matrices = align_prices(price_data)
+    open_, high, low, close = (matrices[column] for column in ('Open', 'High', 'Low', 'Close'))
+
+    # The indicator shifts along the last axis, so it gets the (assets x time) view
+    prev_range = INDICATORS['prev_range']({'High': high.T, 'Low': low.T}).T
+    target = open_ + prev_range * breakout_multiplier
+    with np.errstate(invalid='ignore'):
+        triggered = high > target
+    ror = np.where(triggered, close / target, 1.0)
+
+    # Entries fill intraday at the target, so the weights only see closes up to the previous bar
+    raw = np.where(triggered, allocation_weights(close, allocation, window, lag=1), 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.minimum(np.where(total > 0, raw / total, 0.0), max_weight)
+
+    daily_return = (weights * (ror - 1)).sum(axis=1)
+    equity_curve = initial_investment * np.cumprod(1 + daily_return)
+    summary = pd.DataFrame({'Invested_Weight': weights.sum(axis=1), 'Positions': triggered.sum(axis=1),
+                            'Portfolio_Value': equity_curve}, index=dates)
+    return summary, weights, tickers
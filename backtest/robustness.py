@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.optimizer import BOLLINGER, BREAKOUT
+from backtest.strategies import band_signals, bollinger_bands
+from backtest.sweep import breakout_equity, sweep_equity
+
+METHODS = ('bootstrap', 'gbm')
+
+
+def bar_structure(open_, high, low, close):
+    # Log close-to-close returns plus each bar's open/high/low relative to its own close;
+    # synthetic paths reuse the ratios of whichever bar a return was drawn from, so the
+    # intraday shape (high >= close, low <= open, ...) stays realistic
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    log_returns = np.diff(np.log(close))
+    ratios = np.stack([open_ / close, high / close, low / close])
+    return log_returns, ratios
+
+
+def _build_paths(close0, ratios, log_returns, bars):
+    # (paths x time) OHLC from sampled returns and the bar indices they came from (1-based, bar 0 is kept)
+    n_paths = len(log_returns)
+    close = np.empty((n_paths, len(bars[0]) + 1))
+    close[:, 0] = 0.0
+    np.cumsum(log_returns, axis=1, out=close[:, 1:])
+    close = close0 * np.exp(close)
+    bars = np.concatenate([np.zeros((n_paths, 1), dtype=np.int64), bars], axis=1)
+    open_, high, low = (close * ratios[i][bars] for i in range(3))
+    return open_, high, low, close
+
+
+def bootstrap_paths(open_, high, low, close, n_paths, rng, block=20):
+    # Moving-block bootstrap: the return series is rebuilt from randomly placed blocks of
+    # consecutive bars, which keeps short-range autocorrelation and volatility clustering
+    log_returns, ratios = bar_structure(open_, high, low, close)
+    n_returns = len(log_returns)
+    block = max(1, min(block, n_returns))
+    n_blocks = -(-n_returns // block)
+    starts = rng.integers(0, n_returns - block + 1, size=(n_paths, n_blocks))
+    picks = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n_returns]
+    return _build_paths(float(close[0]), ratios, log_returns[picks], picks + 1)
+
+
+def gbm_paths(open_, high, low, close, n_paths, rng):
+    # Geometric Brownian motion with the drift and volatility of the observed log returns;
+    # intraday ratios are drawn from random historical bars
+    log_returns, ratios = bar_structure(open_, high, low, close)
+    n_returns = len(log_returns)
+    sampled = rng.normal(log_returns.mean(), log_returns.std(ddof=1), size=(n_paths, n_returns))
+    return _build_paths(float(close[0]), ratios, sampled, rng.integers(1, n_returns + 1, size=(n_paths, n_returns)))
+
+
+def path_equity(open_, high, low, close, strategy, params, initial_investment, costs=FRICTIONLESS):
+    # (paths x time) portfolio values from the same sweep functions the apps use, so paths follow the
+    # backtest rules and cost model exactly. Bollinger stacks the paths as lanes of one sweep (bands for
+    # all paths come from one rolling pass); the breakout helpers broadcast one k over every path.
+    if strategy == BOLLINGER:
+        close_by_bar = np.ascontiguousarray(close.T)
+        _, upper, lower = bollinger_bands(close_by_bar)
+        signal = band_signals(close_by_bar, upper, lower).T
+        return sweep_equity(close, signal, initial_investment, [params['buy_portion']], [params['sell_portion']], costs, open_)
+    return breakout_equity(open_, high, low, close, [params['breakout_multiplier']], initial_investment, costs)
+
+
+def max_drawdown(equity):
+    # Worst peak-to-trough loss of each row, as a negative fraction
+    return (equity / np.maximum.accumulate(equity, axis=1) - 1).min(axis=1)
+
+
+def _run_chunk(task):
+    ohlc, strategy, params, initial_investment, method, block, n_paths, seed, costs = task
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        open_, high, low, close = bootstrap_paths(*ohlc, n_paths, rng, block)
+    else:
+        open_, high, low, close = gbm_paths(*ohlc, n_paths, rng)
+
+    equity = path_equity(open_, high, low, close, strategy, params, initial_investment, costs)
+    return np.stack([equity[:, -1], max_drawdown(equity), close[:, -1] / close[:, 0] - 1], axis=1)
+
+
+def monte_carlo(stock_data, strategy, params, initial_investment, n_paths=1000, method='bootstrap', block=20,
+                chunk_paths=256, seed=None, max_workers=None, costs=FRICTIONLESS):
+    # Runs one strategy on n_paths synthetic price paths built from stock_data and returns one row
+    # per path. Paths are generated and simulated chunk_paths at a time, each chunk with its own
+    # child seed, so memory stays bounded and results do not depend on max_workers.
+    # strategy: BOLLINGER with params {'buy_portion', 'sell_portion'} or BREAKOUT with {'breakout_multiplier'}
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if strategy not in (BOLLINGER, BREAKOUT):
+        raise ValueError(f"Unknown strategy {strategy!r}")
+    stock_data = stock_data.sort_index()
+    ohlc = tuple(stock_data[column].to_numpy(dtype=np.float64).reshape(-1) for column in ('Open', 'High', 'Low', 'Close'))
+
+    sizes = [min(chunk_paths, n_paths - start) for start in range(0, n_paths, chunk_paths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(ohlc, strategy, params, initial_investment, method, block, size, child, costs) for size, child in zip(sizes, seeds)]
+    if max_workers is None or max_workers <= 1:
+        chunks = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks = list(executor.map(_run_chunk, tasks))
+
+    results = np.concatenate(chunks) if chunks else np.empty((0, 3))
+    return pd.DataFrame({
+        'Final Portfolio Value': results[:, 0],
+        'Total Profit Ratio (%)': (results[:, 0] - initial_investment) / initial_investment * 100,
+        'Max Drawdown (%)': results[:, 1] * 100,
+        'Buy and Hold Return (%)': results[:, 2] * 100,
+    })
+
+
+def summarize(results_df, percentiles=(5, 25, 50, 75, 95)):
+    # Percentile table of the per-path results
+    summary = results_df.quantile([p / 100 for p in percentiles])
+    summary.index = [f'P{p}' for p in percentiles]
+    summary.loc['Mean'] = results_df.mean()
+    return summary
@@ -0,0 +1,214 @@
+import itertools
+import math
+
+import numpy as np
+
+from backtest.costs import FRICTIONLESS
+from backtest.engine import equity_curve, final_value, simulate_ledger
+from backtest.indicators import INDICATORS
+from backtest.optimizer import rank_results
+from backtest.strategies import bollinger_signals, breakout_columns
+
+
+class Objective:
+    # Scores one parameter set on bars [start, stop) of a fixed price series. Indicators are
+    # computed over the full series once per distinct setting and only sliced per call, so
+    # searches can cheaply score candidates on shorter sub-periods.
+    def __init__(self, stock_data, initial_investment, costs=FRICTIONLESS):
+        stock_data = stock_data.sort_index()
+        self.open, self.high, self.low, self.close = (stock_data[column].to_numpy(dtype=np.float64).reshape(-1)
+                                                      for column in ('Open', 'High', 'Low', 'Close'))
+        self.initial_investment = initial_investment
+        self.costs = costs
+        self.n_bars = len(self.close)
+        self.evaluations = 0
+        self.bars_evaluated = 0
+        self._indicators = {}
+
+    def __call__(self, params, start=0, stop=None):
+        stop = self.n_bars if stop is None else stop
+        self.evaluations += 1
+        self.bars_evaluated += stop - start
+        return self.evaluate(params, start, stop)
+
+    def indicator(self, key, compute):
+        if key not in self._indicators:
+            self._indicators[key] = compute()
+        return self._indicators[key]
+
+    def evaluate(self, params, start, stop):
+        raise NotImplementedError
+
+    def equity(self, params):
+        # Full-series equity curve of one parameter set, for the metric columns of the final results
+        raise NotImplementedError
+
+
+class BollingerObjective(Objective):
+    # params: buy_portion, sell_portion and optionally window / num_std
+    def _ledger(self, params, start, stop):
+        window, num_std = params.get('window', 20), params.get('num_std', 2)
+        signal = self.indicator(('signals', window, num_std), lambda: bollinger_signals(self.close, window, num_std))
+        return simulate_ledger(self.close[start:stop], signal[start:stop], self.initial_investment,
+                               params['buy_portion'], params['sell_portion'], self.costs, self.open[start:stop])
+
+    def evaluate(self, params, start, stop):
+        return final_value(self._ledger(params, start, stop), self.close[start:stop], self.initial_investment)
+
+    def equity(self, params):
+        return equity_curve(self._ledger(params, 0, self.n_bars), self.close, self.initial_investment)
+
+
+class BreakoutObjective(Objective):
+    # params: breakout_multiplier
+    def _columns(self, params):
+        k = params['breakout_multiplier']
+        prev_range = self.indicator(('prev_range',), lambda: INDICATORS['prev_range']({'High': self.high, 'Low': self.low}))
+        return self.indicator(('breakout', k), lambda: breakout_columns(self.open, self.high, self.low, self.close, k, self.costs, prev_range))
+
+    def evaluate(self, params, start, stop):
+        columns = self._columns(params)
+        if self.costs.commission_fixed:
+            return float(self.costs.compound(columns['ror'][start:stop], columns['Buy'][start:stop], self.initial_investment)[-1])
+        return self.initial_investment * float(np.prod(columns['ror'][start:stop]))
+
+    def equity(self, params):
+        columns = self._columns(params)
+        return self.costs.compound(columns['ror'], columns['Buy'], self.initial_investment)
+
+
+def _space(space):
+    names = list(space)
+    return names, [list(space[name]) for name in names]
+
+
+def _point_params(names, values, point):
+    return {name: values[d][i] for d, (name, i) in enumerate(zip(names, point))}
+
+
+def _random_points(rng, sizes, count, exclude=()):
+    # Unique index tuples drawn uniformly from the grid, never repeating one in exclude
+    count = min(count, math.prod(sizes) - len(exclude))
+    seen, points = set(exclude), []
+    while len(points) < count:
+        point = tuple(int(rng.integers(size)) for size in sizes)
+        if point not in seen:
+            seen.add(point)
+            points.append(point)
+    return points
+
+
+def grid_search(space, objective, budget=None, seed=None):
+    # Every combination; the reference the other searches are measured against
+    names, values = _space(space)
+    return [(params, objective(params)) for params in
+            (dict(zip(names, combination)) for combination in itertools.product(*values))]
+
+
+def random_search(space, objective, budget=50, seed=None):
+    names, values = _space(space)
+    points = _random_points(np.random.default_rng(seed), [len(v) for v in values], budget)
+    return [(params, objective(params)) for params in (_point_params(names, values, point) for point in points)]
+
+
+def successive_halving(space, objective, budget=81, seed=None, eta=3, min_bars=252):
+    # Starts budget random candidates on the first n_bars / eta**rungs bars (at least min_bars),
+    # keeps the best 1/eta of them and multiplies the period by eta, until the last rung runs on
+    # the full series. Leading periods are used because the full run starts down the same path.
+    # Only that last rung is returned, since shorter periods are not comparable.
+    names, values = _space(space)
+    points = _random_points(np.random.default_rng(seed), [len(v) for v in values], budget)
+    # Smallest number of halvings that gets down to one candidate; integers, as log() rounding can add a rung
+    rungs = 0
+    while eta ** rungs < len(points):
+        rungs += 1
+    lengths = [min(objective.n_bars, max(min_bars, objective.n_bars // eta ** (rungs - rung))) for rung in range(rungs)]
+    lengths.append(objective.n_bars)
+    cuts = 0
+    for rung, length in enumerate(lengths):
+        # Rungs clamped to the same length as the next one would re-score the survivors on identical
+        # bars, so they are merged: the candidates are scored once there and all the cuts made at once
+        if rung < rungs and lengths[rung + 1] == length:
+            cuts += 1
+            continue
+        scored = [(point, objective(_point_params(names, values, point), 0, length))
+                  for point in points]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        keep = len(scored)
+        for _ in range(cuts):
+            keep = max(1, keep // eta)
+        if rung == rungs:
+            return [(_point_params(names, values, point), value) for point, value in scored[:keep]]
+        points = [point for point, _ in scored[:max(1, keep // eta)]]
+        cuts = 0
+    return []
+
+
+def _parzen(indices, size, bandwidth):
+    # Smoothed histogram over the value indices of one dimension, with a flat prior so no value gets zero mass
+    grid = np.arange(size)[:, None]
+    density = np.exp(-0.5 * ((grid - np.asarray(indices)[None, :]) / bandwidth) ** 2).sum(axis=1) + 1.0 / size
+    return density / density.sum()
+
+
+def tpe_search(space, objective, budget=50, seed=None, n_startup=10, gamma=0.25, n_candidates=24, patience=20):
+    # Tree-structured Parzen estimator over the index grid: after n_startup random trials, split
+    # the trials into the best gamma fraction and the rest, sample candidates from the density of
+    # the good ones and evaluate the candidate with the highest good/bad density ratio.
+    # Stops early after patience trials without a new best.
+    names, values = _space(space)
+    sizes = [len(v) for v in values]
+    rng = np.random.default_rng(seed)
+    budget = min(budget, math.prod(sizes))
+
+    trials = {}
+    for point in _random_points(rng, sizes, min(n_startup, budget)):
+        trials[point] = objective(_point_params(names, values, point))
+    best, stale = max(trials.values()), 0
+
+    while len(trials) < budget and stale < patience:
+        points = list(trials)
+        order = np.argsort([-trials[point] for point in points])
+        n_good = max(1, int(math.ceil(gamma * len(points))))
+        good = np.array([points[i] for i in order[:n_good]])
+        bad = np.array([points[i] for i in order[n_good:]]) if len(points) > n_good else good
+
+        candidates = np.empty((n_candidates, len(sizes)), dtype=int)
+        ratio = np.ones(n_candidates)
+        for d, size in enumerate(sizes):
+            bandwidth = max(1.0, size / 10)
+            good_density, bad_density = _parzen(good[:, d], size, bandwidth), _parzen(bad[:, d], size, bandwidth)
+            candidates[:, d] = rng.choice(size, size=n_candidates, p=good_density)
+            ratio *= good_density[candidates[:, d]] / bad_density[candidates[:, d]]
+
+        point = next((tuple(int(i) for i in candidates[c]) for c in np.argsort(-ratio)
+                      if tuple(int(i) for i in candidates[c]) not in trials), None)
+        if point is None:
+            point = _random_points(rng, sizes, 1, exclude=trials)[0]
+
+        trials[point] = value = objective(_point_params(names, values, point))
+        if value > best:
+            best, stale = value, 0
+        else:
+            stale += 1
+
+    return [(_point_params(names, values, point), value) for point, value in trials.items()]
+
+
+# Register new searches here; each takes (space, objective, budget, seed, **options) and
+# returns [(params, final portfolio value on the full series), ...]
+SEARCHES = {
+    'grid': grid_search,
+    'random': random_search,
+    'halving': successive_halving,
+    'tpe': tpe_search,
+}
+
+
+def optimize(space, objective, method='tpe', budget=50, seed=None, **options):
+    # space: {param name: candidate values}; returns the evaluated parameter sets ranked like run_optimization
+    initial_investment = objective.initial_investment
+    rows = [{**params, 'Final Portfolio Value': value,
+             'Total Profit Ratio (%)': (value - initial_investment) / initial_investment * 100}
+            for params, value in SEARCHES[method](space, objective, budget, seed, **options)]
+    return rank_results(rows)
@@ -0,0 +1,335 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from backtest.instrument import count_cache
+
+DEFAULT_RESULT_DIR = os.environ.get('RESULT_CACHE_DIR', Path(__file__).resolve().parent.parent / '.result_cache')
+
+SUBSCRIBER_TIMEOUT = 10.0  # seconds without a check-in before a job viewer counts as gone
+
+logger = logging.getLogger(__name__)
+
+
+def result_key(*parts):
+    # Stable digest of a request, e.g. ('bollinger_sweep', data fingerprint, grid, costs).
+    # Parts must have a deterministic repr: strings, numbers, tuples, ranges, frozen dataclasses.
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def chunked(values, size):
+    values = list(values)
+    return [tuple(values[i:i + size]) for i in range(0, len(values), size)]
+
+
+def concat_ranked(frames, rank_by):
+    # combine for sweep jobs: chunk tables -> one table ranked over every row finished so far
+    results_df = pd.concat(frames, ignore_index=True)
+    results_df['Profit Ranking'] = results_df[rank_by].rank(ascending=False, method='min', na_option='bottom').astype(int)
+    return results_df
+
+
+class ResultCache:
+    # In-memory LRU in front of one pickle file per key. Everything in the process (every
+    # Streamlit session) shares the memory tier; the disk tier survives restarts and can be
+    # shared by several server processes pointed at the same directory.
+    def __init__(self, root=DEFAULT_RESULT_DIR, max_entries=128, max_disk_entries=2048):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.root / f'{key}.pkl'
+
+    def get(self, key):
+        # Returns (found, value)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return True, self._memory[key]
+        path = self._path(key)
+        try:
+            value = pickle.loads(path.read_bytes())
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # A truncated or incompatible file is just a miss; it is rewritten on the next put
+            logger.warning("Ignoring unreadable cached result %s", path, exc_info=True)
+            return False, None
+        os.utime(path)  # disk eviction is least-recently-used by mtime
+        self._remember(key, value)
+        return True, value
+
+    def put(self, key, value):
+        self._remember(key, value)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        paths = list(self.root.glob('*.pkl'))
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=lambda path: path.stat().st_mtime)
+        for path in paths[:len(paths) - self.max_disk_entries]:
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for pattern in ('*.pkl', '*.checkpoint'):
+            for path in self.root.glob(pattern):
+                path.unlink(missing_ok=True)
+
+
+class Job:
+    # Background run of compute(chunk) over a list of chunks, e.g. slices of a parameter grid or
+    # single tickers. Finished chunks are visible through partial() while the rest run, and are
+    # checkpointed to disk, so a cancelled or crashed job resumes with only the missing chunks.
+    # combine(list of chunk results in chunk order) builds the (partial or final) result.
+    # cleanup(), if given, runs once the job has finished, e.g. to release a worker pool the chunks share.
+    def __init__(self, key, compute, chunks, combine, checkpoint_path=None, cleanup=None):
+        self.key = key
+        self.compute = compute
+        self.chunks = list(chunks)
+        self.combine = combine
+        self.checkpoint_path = checkpoint_path
+        self.cleanup = cleanup
+        self.total = len(self.chunks)
+        self.status = 'running'
+        self.result = None
+        self.error = None
+        self._results = {}
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._subscribers = {}
+        self._load_checkpoint()
+
+    @classmethod
+    def finished(cls, key, result, total):
+        job = cls(key, None, [None] * total, None)
+        job.status, job.result = 'done', result
+        job._finished.set()
+        return job
+
+    def _load_checkpoint(self):
+        if self.checkpoint_path is None:
+            return
+        try:
+            results = pickle.loads(Path(self.checkpoint_path).read_bytes())
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.warning("Ignoring unreadable checkpoint %s", self.checkpoint_path, exc_info=True)
+            return
+        self._results = {index: value for index, value in results.items() if index < self.total}
+        if self._results:
+            logger.info("Resuming %s from %d / %d checkpointed chunks", self.key, len(self._results), self.total)
+
+    def _write_checkpoint(self):
+        # Called with self._lock held, so writes never interleave
+        if self.checkpoint_path is None:
+            return
+        path = Path(self.checkpoint_path)
+        tmp_path = path.with_suffix(f'.checkpoint.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(pickle.dumps(self._results, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, path)
+
+    @property
+    def completed(self):
+        return self.total if self.status == 'done' else len(self._results)
+
+    @property
+    def cancelling(self):
+        return self._cancelled.is_set()
+
+    def progress(self):
+        return self.completed / self.total if self.total else 1.0
+
+    def partial(self):
+        if self.status == 'done':
+            return self.result
+        with self._lock:
+            parts = [self._results[index] for index in sorted(self._results)]
+        return self.combine(parts) if parts else None
+
+    def cancel(self):
+        # Chunks already running finish (and are checkpointed); queued ones are skipped
+        self._cancelled.set()
+
+    def subscribe(self, subscriber):
+        # Viewers (e.g. Streamlit sessions) check in on every redraw; one that stops checking in
+        # for SUBSCRIBER_TIMEOUT seconds, like a closed page, no longer keeps the job alive
+        with self._lock:
+            self._subscribers[subscriber] = time.monotonic()
+
+    def unsubscribe(self, subscriber):
+        # Cancels the job once the last live subscriber leaves; returns how many are still watching
+        with self._lock:
+            self._subscribers.pop(subscriber, None)
+            cutoff = time.monotonic() - SUBSCRIBER_TIMEOUT
+            remaining = sum(seen >= cutoff for seen in self._subscribers.values())
+        if not remaining:
+            self.cancel()
+        return remaining
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def start(self, executor, on_done=None):
+        pending = [index for index in range(self.total) if index not in self._results]
+        self._remaining = len(pending)
+        self._on_done = on_done
+        if not pending:
+            self._finish()
+        for index in pending:
+            executor.submit(self._run_chunk, index)
+
+    def _run_chunk(self, index):
+        try:
+            if self._cancelled.is_set() or self.error is not None:
+                return
+            value = self.compute(self.chunks[index])
+            with self._lock:
+                self._results[index] = value
+                self._write_checkpoint()
+        except Exception as error:
+            logger.exception("Chunk %d of %s failed", index, self.key)
+            self.error = error
+        finally:
+            with self._lock:
+                self._remaining -= 1
+                last = self._remaining == 0
+            if last:
+                self._finish()
+
+    def _finish(self):
+        try:
+            if self.error is not None:
+                self.status = 'failed'
+            elif len(self._results) < self.total:
+                self.status = 'cancelled'
+            else:
+                self.result = self.combine([self._results[index] for index in range(self.total)])
+                self.status = 'done'
+                if self.checkpoint_path is not None:
+                    Path(self.checkpoint_path).unlink(missing_ok=True)
+        except Exception as error:
+            logger.exception("Combining %s failed", self.key)
+            self.error, self.status = error, 'failed'
+        if self.cleanup is not None:
+            try:
+                self.cleanup()
+            except Exception:
+                logger.exception("Cleaning up %s failed", self.key)
+        if self._on_done is not None:
+            self._on_done(self)
+        self._finished.set()
+
+
+class BacktestService:
+    # In-process job queue for backtests and sweeps. Each distinct key is computed once:
+    # identical requests that arrive while it runs share its Future, later ones are served
+    # from the ResultCache. compute must be a pure function of the key's inputs.
+    # Background jobs get their own workers, so a long sweep never queues blocking run() calls behind its chunks.
+    def __init__(self, cache=None, max_workers=2, job_workers=2):
+        self.cache = cache if cache is not None else ResultCache()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backtest')
+        self._job_executor = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix='backtest-job')
+        self._in_flight = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+
+    def submit(self, key, compute, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                count_cache(hit=True)
+                return future
+            found, value = self.cache.get(key)
+            if found:
+                self.cache_hits += 1
+                count_cache(hit=True)
+                future = Future()
+                future.set_result(value)
+                return future
+            self.computed += 1
+            count_cache(hit=False)
+            future = self._executor.submit(self._run, key, compute, args, kwargs)
+            self._in_flight[key] = future
+        return future
+
+    def _run(self, key, compute, args, kwargs):
+        try:
+            value = compute(*args, **kwargs)
+            self.cache.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def run(self, key, compute, *args, **kwargs):
+        return self.submit(key, compute, *args, **kwargs).result()
+
+    def start(self, key, compute, chunks, combine, cleanup=None):
+        # Non-blocking counterpart of run for long sweeps: returns a Job that computes chunk by chunk.
+        # Every session asking for the same key while it runs gets the same Job. Finished jobs are
+        # dropped, so starting a cancelled or failed key again reruns only the chunks missing from its checkpoint.
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self.deduplicated += 1
+                count_cache(hit=True)
+                return job
+            found, value = self.cache.get(key)
+            if found:
+                self.cache_hits += 1
+                count_cache(hit=True)
+                return Job.finished(key, value, len(chunks))
+            self.computed += 1
+            count_cache(hit=False)
+            job = Job(key, compute, chunks, combine, self.cache.root / f'{key}.checkpoint', cleanup)
+            self._jobs[key] = job
+        job.start(self._job_executor, on_done=self._job_done)
+        return job
+
+    def _job_done(self, job):
+        if job.status == 'done':
+            self.cache.put(job.key, job.result)
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._in_flight) + len(self._jobs)
+        return {'computed': self.computed, 'cache_hits': self.cache_hits, 'deduplicated': self.deduplicated, 'in_flight': in_flight}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self._job_executor.shutdown(wait=True)
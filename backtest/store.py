@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from backtest.bars import INTERVALS, compact_ohlcv, is_intraday
+
+DEFAULT_STORE_DIR = os.environ.get('STOCK_STORE_DIR', Path(__file__).resolve().parent.parent / '.price_store')
+
+
+def yahoo_source(ticker, start, end, interval='1d', timeout=10):
+    import yfinance as yf
+    _, history, span = INTERVALS[interval]
+    if not is_intraday(interval):
+        return yf.download(ticker, start=start, end=end, progress=False, timeout=timeout)
+
+    # Yahoo only serves recent intraday history, in spans of limited length
+    start = max(pd.Timestamp(start), pd.Timestamp.today().normalize() - history + pd.Timedelta(days=1))
+    chunks = []
+    for chunk_start in pd.date_range(start, pd.Timestamp(end), freq=span, inclusive='left'):
+        chunk_end = min(chunk_start + span, pd.Timestamp(end))
+        chunks.append(normalize_ohlcv(yf.download(ticker, start=chunk_start.date(), end=chunk_end.date(), interval=interval,
+                                                  progress=False, timeout=timeout)))
+    chunks = [chunk for chunk in chunks if not chunk.empty]
+    return pd.concat(chunks) if chunks else pd.DataFrame()
+
+
+def csv_source(directory):
+    # Local fixture source: reads <directory>/<ticker>.csv (or <ticker>@<interval>.csv) with a Date column
+    def fetch(ticker, start, end, interval='1d'):
+        name = ticker if not is_intraday(interval) else f'{ticker}@{interval}'
+        stock_data = pd.read_csv(Path(directory) / f'{name}.csv', index_col='Date', parse_dates=True)
+        return stock_data[(stock_data.index >= pd.Timestamp(start)) & (stock_data.index < pd.Timestamp(end))]
+    return fetch
+
+
+def normalize_ohlcv(stock_data):
+    # yfinance returns (Price, Ticker) columns for downloads; keep one flat level and a 'Date' index.
+    # Timezone-aware (intraday) bars are stored as naive UTC, so they compare with the clock wherever the server runs.
+    stock_data = stock_data.copy()
+    if not isinstance(stock_data.index, pd.DatetimeIndex):
+        stock_data.index = pd.DatetimeIndex(stock_data.index)
+    if isinstance(stock_data.columns, pd.MultiIndex):
+        stock_data.columns = stock_data.columns.get_level_values(0)
+    stock_data.columns.name = None
+    if stock_data.index.tz is not None:
+        stock_data.index = stock_data.index.tz_convert('UTC').tz_localize(None)
+    stock_data.index.name = 'Date'
+    return stock_data
+
+
+class PriceStore:
+    # One Parquet file per ticker and interval plus a small JSON sidecar recording the
+    # date range that has already been fetched, as [start, end) like yf.download. Requests
+    # only fetch the missing head/tail of that range; the open bar for today is refetched
+    # once refresh_ttl seconds have passed. Intraday bars are stored compacted (float32/int32).
+    def __init__(self, root=DEFAULT_STORE_DIR, source=yahoo_source, refresh_ttl=1200):
+        self.root = Path(root)
+        self.source = source
+        self.refresh_ttl = refresh_ttl
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, ticker, interval='1d'):
+        name = ticker if not is_intraday(interval) else f'{ticker}@{interval}'
+        return self.root / f'{name}.parquet', self.root / f'{name}.json'
+
+    def load(self, ticker, interval='1d'):
+        data_path, meta_path = self._paths(ticker, interval)
+        if not data_path.exists() or not meta_path.exists():
+            return None, None
+        meta = json.loads(meta_path.read_text())
+        if is_intraday(interval) and meta.get('index_tz') != 'UTC':
+            return None, None  # stored in exchange time before the index moved to UTC; refetched once
+        return pd.read_parquet(data_path), meta
+
+    def _save(self, ticker, interval, stock_data, meta):
+        # Data before its sidecar, so a reader never sees metadata describing bars that aren't on disk;
+        # temp names are per process and thread so concurrent writers never share one
+        data_path, meta_path = self._paths(ticker, interval)
+        for path, write in ((data_path, lambda p: stock_data.to_parquet(p)),
+                            (meta_path, lambda p: p.write_text(json.dumps(meta)))):
+            tmp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.{threading.get_ident()}.tmp')
+            write(tmp_path)
+            os.replace(tmp_path, path)
+
+    def _fetch(self, ticker, start, end, interval):
+        return normalize_ohlcv(self.source(ticker, start.date(), end.date(), interval=interval))
+
+    def missing_ranges(self, meta, start, end):
+        today = pd.Timestamp.today().normalize()
+        if meta is None:
+            return [(start, end)]
+        covered_start, covered_end = pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start))
+        if end > covered_end:
+            fresh = covered_end >= today and time.time() - meta['fetched_at'] < self.refresh_ttl
+            if not fresh:
+                gaps.append((covered_end, end))
+        return gaps
+
+    def refresh(self, ticker, start, end, interval='1d'):
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        stock_data, meta = self.load(ticker, interval)
+        gaps = self.missing_ranges(meta, start, end)
+        if not gaps:
+            return stock_data
+
+        frames = [] if stock_data is None else [stock_data]
+        frames += [self._fetch(ticker, gap_start, gap_end, interval) for gap_start, gap_end in gaps]
+        frames = [frame for frame in frames if not frame.empty]
+        stock_data = pd.concat(frames) if frames else normalize_ohlcv(pd.DataFrame(index=pd.DatetimeIndex([])))
+        stock_data = stock_data[~stock_data.index.duplicated(keep='last')].sort_index()
+        if is_intraday(interval):
+            stock_data = compact_ohlcv(stock_data)
+
+        # Today's bar may still be forming, so coverage never extends past today
+        today = pd.Timestamp.today().normalize()
+        covered_start = start if meta is None else min(start, pd.Timestamp(meta['start']))
+        covered_end = min(end, today) if meta is None else max(min(end, today), pd.Timestamp(meta['end']))
+        self._save(ticker, interval, stock_data, {'start': covered_start.isoformat(), 'end': covered_end.isoformat(),
+                                        'fetched_at': time.time(), 'index_tz': 'UTC'})
+        return stock_data
+
+    def get(self, ticker, start, end, interval='1d'):
+        stock_data = self.refresh(ticker, start, end, interval)
+        dates = stock_data.index
+        return stock_data.iloc[dates.searchsorted(pd.Timestamp(start)):dates.searchsorted(pd.Timestamp(end))]
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from backtest.costs import FRICTIONLESS
+from backtest.indicators import INDICATORS
+from backtest.sweep import breakout_ror, breakout_targets
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    # close may also be a (time x assets) matrix; every column gets its own bands
+    close = pd.DataFrame(close, dtype=np.float64) if np.ndim(close) == 2 else pd.Series(close, dtype=np.float64)
+    rolling_mean = close.rolling(window=window).mean().to_numpy()
+    rolling_std = close.rolling(window=window).std().to_numpy()
+    return rolling_mean, rolling_mean + (rolling_std * num_std), rolling_mean - (rolling_std * num_std)
+
+
+def band_signals(close, upper, lower):
+    # 1 = close below the lower band (buy), -1 = close above the upper band (sell)
+    close = np.asarray(close, dtype=np.float64)
+    signal = np.zeros(close.shape, dtype=np.int8)
+    signal[close < lower] = 1
+    signal[close > upper] = -1
+    return signal
+
+
+def bollinger_signals(close, window=20, num_std=2):
+    _, upper, lower = bollinger_bands(close, window, num_std)
+    return band_signals(close, upper, lower)
+
+
+def breakout_columns(open_, high, low, close, breakout_multiplier, costs=FRICTIONLESS, prev_range=None):
+    # Volatility breakout columns: buy when the high breaks Open + previous day's
+    # range * k, sell at the close, and compound the daily return. With a cost model ror is
+    # net of spread, slippage and bps commission; fixed fees are charged in costs.compound.
+    # The target and returns are the single-k lane of the sweep functions.
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    if prev_range is None:
+        prev_range = INDICATORS['prev_range']({'High': high, 'Low': low})
+    target = breakout_targets(open_, high, low, [breakout_multiplier], prev_range)[0]
+    buy = high > target
+    ror = breakout_ror(open_, high, low, close, [breakout_multiplier], costs, prev_range)[0]
+    return {'Range': high - low, 'Target': target, 'Buy': buy, 'ror': ror, 'Profit': np.cumprod(ror)}
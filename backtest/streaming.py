@@ -0,0 +1,96 @@
+import math
+from collections import deque
+
+from backtest.engine import apply_signal
+
+NAN = float('nan')
+
+
+class RollingStats:
+    # Sliding-window mean and sample variance (ddof=1, like pandas rolling().std())
+    # kept with Welford's update, so each new value costs O(1) regardless of history.
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.values.append(value)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            new_mean = self.mean + (value - old) / self.window
+            self.m2 += (value - old) * (value - new_mean + old - self.mean)
+            self.mean = new_mean
+        else:
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window
+
+    @property
+    def sma(self):
+        return self.mean if self.ready else NAN
+
+    @property
+    def std(self):
+        if not self.ready or self.window < 2:
+            return NAN
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+
+class BollingerStream:
+    # Streaming counterpart of the bands, signals and trade rules of bollinger.add_stock_data:
+    # feed one close at a time with update().
+    def __init__(self, initial_investment, buy_portion, sell_portion, moving_average_periods=(), window=20, num_std=2):
+        self.averages = {period: RollingStats(period) for period in moving_average_periods}
+        self.bands = RollingStats(window)
+        self.window = window
+        self.num_std = num_std
+        self.trade_money = initial_investment // buy_portion
+        self.sell_portion = sell_portion
+        self.total_money = initial_investment
+        self.shares = 0
+
+    def update(self, close):
+        for stats in self.averages.values():
+            stats.update(close)
+        self.bands.update(close)
+
+        mid, std = self.bands.sma, self.bands.std
+        upper, lower = mid + std * self.num_std, mid - std * self.num_std
+        signal = 1 if close < lower else -1 if close > upper else 0
+
+        self.total_money, self.shares, trade_amount, trade_count = apply_signal(
+            signal, close, self.total_money, self.shares, self.trade_money, self.sell_portion
+        )
+
+        bar = {f'SMA_{period}': stats.sma for period, stats in self.averages.items()}
+        bar.update({
+            f'BB_mid_{self.window}': mid, f'BB_upper_{self.window}': upper, f'BB_lower_{self.window}': lower,
+            'Signal': signal, 'Trade_Amount': trade_amount, 'Trade_Count': trade_count,
+            'Shares_held': self.shares, 'Portfolio_Value': self.shares * close + self.total_money,
+        })
+        return bar
+
+
+class BreakoutStream:
+    # Streaming counterpart of breakout.add_stock_data + simulate_trading: only the previous
+    # bar's range and the running profit are kept.
+    def __init__(self, initial_investment, breakout_multiplier):
+        self.initial_investment = initial_investment
+        self.breakout_multiplier = breakout_multiplier
+        self.prev_range = NAN
+        self.profit = 1.0
+
+    def update(self, open_, high, low, close):
+        target = open_ + self.prev_range * self.breakout_multiplier
+        buy = high > target
+        ror = close / target if buy else 1
+        self.profit *= ror
+        self.prev_range = high - low
+        return {'Range': self.prev_range, 'Target': target, 'Buy': buy, 'ror': ror,
+                'Profit': self.profit, 'Portfolio_Value': self.profit * self.initial_investment}
@@ -0,0 +1,168 @@
+import numpy as np
+
+from backtest.costs import FRICTIONLESS
+from backtest.indicators import INDICATORS
+
+
+def sweep_state(close, signal, initial_investment, buy_portions, sell_portions, state=None, history=None,
+                costs=FRICTIONLESS, open_=None):
+    # Runs the simulate_trades rules for every (buy_portion, sell_portion) pair at once.
+    # Each parameter set is one lane of a state vector, so we step through the signal
+    # bars a single time and the per-step work is a handful of vector ops over the grid.
+    # Returns the flattened (total_money, shares) lanes; passing them back in as state
+    # continues the same runs over the next stretch of bars. A history list collects the
+    # lanes after every fill. Fill prices come precomputed from the cost model.
+    # A 2-D close / signal / open_ holds one price path per row (e.g. Monte Carlo paths); every
+    # path then runs the whole grid as its own lanes, path-major, and history grows per fill bar.
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal)
+    buy_grid, sell_grid = np.meshgrid(np.asarray(buy_portions), np.asarray(sell_portions), indexing='ij')
+    paths = len(close) if close.ndim == 2 else 1
+
+    trade_money = np.tile((initial_investment // buy_grid).ravel(), paths)
+    budget = costs.budget(trade_money)
+    sell_portion = np.tile(sell_grid.ravel(), paths)
+    if state is None:
+        total_money = np.full(trade_money.shape, float(initial_investment))
+        shares = np.zeros(trade_money.shape)
+    else:
+        total_money, shares = (np.array(lane, dtype=np.float64) for lane in state)
+
+    if close.ndim == 2:
+        _step_paths(close, signal, open_, costs, buy_grid.size, trade_money, budget, sell_portion, total_money, shares, history)
+        return total_money, shares
+
+    _, sides, buy_prices, sell_prices = costs.fills(signal, open_, close)
+    for side, buy_price, sell_price in zip(sides.tolist(), buy_prices.tolist(), sell_prices.tolist()):
+        # Buy signal
+        if side == 1:
+            can_buy = (total_money >= trade_money) if costs.fractional else (trade_money > buy_price) & (total_money >= trade_money)
+            shares_bought = np.where(can_buy, costs.quantity(budget, buy_price), 0.0)
+            cost = shares_bought * buy_price
+            if costs.charges_commission:
+                cost += np.where(shares_bought > 0, costs.commission(cost), 0.0)
+            total_money -= cost
+            shares += shares_bought
+
+        # Sell signal
+        else:
+            shares_to_sell = np.where(shares > 0, costs.quantity(shares, sell_portion), 0.0)
+            proceeds = shares_to_sell * sell_price
+            if costs.charges_commission:
+                proceeds -= np.where(shares_to_sell > 0, costs.commission(proceeds), 0.0)
+            total_money += proceeds
+            shares -= shares_to_sell
+
+        if history is not None:
+            history.append((total_money.copy(), shares.copy()))
+
+    return total_money, shares
+
+
+def _step_paths(close, signal, open_, costs, grid_lanes, trade_money, budget, sell_portion, total_money, shares, history):
+    # sweep_state over (paths x time) prices: one step per bar on which any path fills, where the
+    # lanes of paths without an order on that bar are left unchanged
+    sides, buy_prices, sell_prices = costs.path_fills(signal, open_, close)
+    for bar in np.flatnonzero(sides.any(axis=0)):
+        side = np.repeat(sides[:, bar], grid_lanes)
+        buy_price, sell_price = np.repeat(buy_prices[:, bar], grid_lanes), np.repeat(sell_prices[:, bar], grid_lanes)
+
+        # Buy signal
+        can_buy = (side == 1) & (total_money >= trade_money)
+        if not costs.fractional:
+            can_buy &= trade_money > buy_price
+        shares_bought = np.where(can_buy, costs.quantity(budget, buy_price), 0.0)
+        cost = shares_bought * buy_price
+        if costs.charges_commission:
+            cost += np.where(shares_bought > 0, costs.commission(cost), 0.0)
+        total_money -= cost
+        shares += shares_bought
+
+        # Sell signal
+        shares_to_sell = np.where((side == -1) & (shares > 0), costs.quantity(shares, sell_portion), 0.0)
+        proceeds = shares_to_sell * sell_price
+        if costs.charges_commission:
+            proceeds -= np.where(shares_to_sell > 0, costs.commission(proceeds), 0.0)
+        total_money += proceeds
+        shares -= shares_to_sell
+
+        if history is not None:
+            history.append((total_money.copy(), shares.copy()))
+
+
+def sweep_trades(close, signal, initial_investment, buy_portions, sell_portions, costs=FRICTIONLESS, open_=None):
+    total_money, shares = sweep_state(close, signal, initial_investment, buy_portions, sell_portions, costs=costs, open_=open_)
+    final_portfolio_value = shares * float(close[-1]) + total_money
+    return final_portfolio_value.reshape(len(buy_portions), len(sell_portions))
+
+
+def sweep_equity(close, signal, initial_investment, buy_portions, sell_portions, costs=FRICTIONLESS, open_=None):
+    # Portfolio value of every (buy_portion, sell_portion) pair at every bar, shaped
+    # (len(buy_portions) * len(sell_portions), time), or (paths * that, time) for 2-D prices;
+    # lanes are forward-filled between fills
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal)
+    grid_lanes = len(buy_portions) * len(sell_portions)
+    lanes = grid_lanes * (len(close) if close.ndim == 2 else 1)
+    history = [(np.full(lanes, float(initial_investment)), np.zeros(lanes))]
+    sweep_state(close, signal, initial_investment, buy_portions, sell_portions, history=history, costs=costs, open_=open_)
+    total_money, shares = np.stack([lane for lane, _ in history]), np.stack([lane for _, lane in history])
+
+    if close.ndim == 2:
+        bars = np.flatnonzero(costs.path_fills(signal, open_, close)[0].any(axis=0))
+        close_by_bar = np.repeat(close, grid_lanes, axis=0).T
+    else:
+        bars = costs.fills(signal, open_, close)[0]
+        close_by_bar = close[:, None]
+    state = np.searchsorted(bars, np.arange(close_by_bar.shape[0]), side='right')
+    return (shares[state] * close_by_bar + total_money[state]).T
+
+
+def breakout_targets(open_, high, low, breakout_multipliers, prev_range=None):
+    # (k x time) stop-buy levels: Open + previous bar's range * k. The range does not depend on k,
+    # so it comes once from the 'prev_range' indicator (pass the pipeline's cached array when there
+    # is one) and is broadcast against the column of k values. Prices may also be (paths x time).
+    if prev_range is None:
+        prev_range = INDICATORS['prev_range']({'High': high, 'Low': low})
+    return np.asarray(open_, dtype=np.float64) + prev_range * np.asarray(breakout_multipliers, dtype=np.float64).reshape(-1, 1)
+
+
+def breakout_ror(open_, high, low, close, breakout_multipliers, costs=FRICTIONLESS, prev_range=None):
+    # Daily returns of the breakout rule as a (k x time) array, net of the cost model's spread,
+    # slippage and bps commission
+    high, close = np.asarray(high, dtype=np.float64), np.asarray(close, dtype=np.float64)
+    target = breakout_targets(open_, high, low, breakout_multipliers, prev_range)
+    if costs == FRICTIONLESS:
+        return np.where(high > target, close / target, 1.0)
+    return costs.breakout_ror(target, close, high > target)
+
+
+def breakout_buys(open_, high, low, breakout_multipliers, prev_range=None):
+    # (k x time) mask of the days a breakout trade was entered, for fixed per-order fees
+    return np.asarray(high, dtype=np.float64) > breakout_targets(open_, high, low, breakout_multipliers, prev_range)
+
+
+def breakout_equity(open_, high, low, close, breakout_multipliers, initial_investment, costs=FRICTIONLESS, prev_range=None):
+    # (k x time) portfolio values of the breakout rule, net of every cost in the model
+    ror = breakout_ror(open_, high, low, close, breakout_multipliers, costs, prev_range)
+    buy = breakout_buys(open_, high, low, breakout_multipliers, prev_range) if costs.commission_fixed else None
+    return costs.compound(ror, buy, initial_investment)
+
+
+def sweep_breakout(open_, high, low, close, breakout_multipliers, chunk_elements=1 << 18, costs=FRICTIONLESS, initial_investment=1.0,
+                   prev_range=None):
+    # Final compounded growth (Profit[-1]) for every k. Rows of k are processed in chunks so the
+    # (k x time) block stays around chunk_elements values however long the series is.
+    # A fixed per-order fee makes growth depend on the account size, hence initial_investment.
+    breakout_multipliers = np.asarray(breakout_multipliers, dtype=np.float64).reshape(-1)
+    if prev_range is None:
+        prev_range = INDICATORS['prev_range']({'High': high, 'Low': low})
+    growth = np.empty(len(breakout_multipliers))
+    rows = max(1, chunk_elements // max(len(close), 1))
+    for i in range(0, len(breakout_multipliers), rows):
+        if costs.commission_fixed:
+            equity = breakout_equity(open_, high, low, close, breakout_multipliers[i:i + rows], initial_investment, costs, prev_range)
+            growth[i:i + rows] = equity[:, -1] / initial_investment
+        else:
+            growth[i:i + rows] = np.prod(breakout_ror(open_, high, low, close, breakout_multipliers[i:i + rows], costs, prev_range), axis=1)
+    return growth
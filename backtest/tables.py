@@ -0,0 +1,68 @@
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+EXPORT_FORMATS = ('parquet', 'feather')
+
+
+def to_arrow(data):
+    # DataFrame, Arrow tables or row dicts -> one Arrow table. Numeric numpy columns are wrapped
+    # without a copy; a non-default index (e.g. bar dates) is kept as a column and restored by to_pandas.
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data)
+    data = list(data)
+    if data and isinstance(data[0], pa.Table):
+        # Bollinger and breakout tables have different parameter columns; missing ones become nulls
+        # and numeric columns are widened where sources disagree (int64 vs double metrics)
+        return pa.concat_tables(data, promote_options='permissive')
+    return pa.Table.from_pylist(data)
+
+
+def to_pandas(table):
+    # Integer columns with nulls (Buy / Sell Portion on breakout rows) keep their integers instead of becoming floats
+    return table.to_pandas(integer_object_nulls=True)
+
+
+def table_fingerprint(results_df):
+    # Content digest of a results DataFrame: index, column names and values
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(results_df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(results_df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def page_count(table, page_size):
+    return max(-(-table.num_rows // page_size), 1)
+
+
+def table_page(table, page, page_size):
+    # The slice is zero-copy; only the rows of one page are converted back to pandas
+    return to_pandas(table.slice(page * page_size, page_size))
+
+
+def export_bytes(table, fmt):
+    sink = pa.BufferOutputStream()
+    if fmt == 'parquet':
+        pq.write_table(table, sink)
+    elif fmt == 'feather':
+        feather.write_feather(table, sink)
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+    return sink.getvalue().to_pybytes()
+
+
+def write_table(data, path):
+    # Format from the suffix: .parquet, .feather / .arrow, anything else is CSV
+    path = Path(path)
+    if path.suffix == '.parquet':
+        pq.write_table(to_arrow(data), path)
+    elif path.suffix in ('.feather', '.arrow'):
+        feather.write_feather(to_arrow(data), path)
+    else:
+        (data if isinstance(data, pd.DataFrame) else to_pandas(to_arrow(data))).to_csv(path, index=False)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+from backtest.bollinger import SIGNAL_COLUMNS
+from backtest.engine import equity_curve, simulate_ledger
+from backtest.pipeline import data_fingerprint, default_pipeline
+from backtest.sweep import breakout_ror, sweep_state
+
+
+def walk_forward_windows(n_bars, train_bars, test_bars, anchored=False):
+    # [(train_start, train_stop, test_stop), ...] with bar offsets; the test windows tile
+    # everything after the first train window. Anchored windows all start at bar 0.
+    return [(0 if anchored else train_stop - train_bars, train_stop, min(train_stop + test_bars, n_bars))
+            for train_stop in range(train_bars, n_bars, test_bars)]
+
+
+class SweepCache:
+    # Bollinger sweep lanes keyed by (start, stop). sweep() runs many windows in one pass over the
+    # bars: each distinct start is a block of lanes that joins at that bar and is snapshotted at each
+    # of its stops, so rolling windows never replay the bars they overlap on and anchored windows
+    # (a single start) cost one pass in total. A later window resumes from its start's latest stop.
+    def __init__(self, close, signal, initial_investment, buy_portions, sell_portions):
+        self.close = close
+        self.signal = signal
+        self.initial_investment = initial_investment
+        self.buy_portions = list(buy_portions)
+        self.sell_portions = list(sell_portions)
+        self.shape = (len(self.buy_portions), len(self.sell_portions))
+        self._states = {}
+
+    def sweep(self, windows):
+        # windows: [(start, stop), ...]; only the ones not cached yet are simulated
+        stops = {}
+        for start, stop in windows:
+            if stop not in self._states.get(start, {}):
+                stops.setdefault(start, set()).add(stop)
+        lanes, joins = {}, {}
+        for start, needed in stops.items():
+            cached = self._states.get(start, {})
+            joins[start] = max((stop for stop in cached if stop < min(needed)), default=start)
+            lanes[start] = cached.get(joins[start], (np.full(self.shape[0] * self.shape[1], float(self.initial_investment)),
+                                                     np.zeros(self.shape[0] * self.shape[1])))
+
+        bars = sorted(set(joins.values()).union(*stops.values()))
+        for segment_start, segment_stop in zip(bars, bars[1:]):
+            running = [start for start in stops if joins[start] <= segment_start < max(stops[start])]
+            if not running:
+                continue
+            # Repeating the buy portions stacks one copy of the grid per running window
+            total_money, shares = sweep_state(self.close[segment_start:segment_stop], self.signal[segment_start:segment_stop],
+                                              self.initial_investment, self.buy_portions * len(running), self.sell_portions,
+                                              state=(np.concatenate([lanes[start][0] for start in running]),
+                                                     np.concatenate([lanes[start][1] for start in running])))
+            for start, money, held in zip(running, total_money.reshape(len(running), -1), shares.reshape(len(running), -1)):
+                lanes[start] = (money, held)
+                if segment_stop in stops[start]:
+                    self._states.setdefault(start, {})[segment_stop] = lanes[start]
+
+    def final_values(self, start, stop):
+        self.sweep([(start, stop)])
+        total_money, shares = self._states[start][stop]
+        return (shares * float(self.close[stop - 1]) + total_money).reshape(self.shape)
+
+
+def _window_row(dates, train_start, train_stop, test_stop, initial_investment, train_value, capital, test_value):
+    return {'Train Start': dates[train_start], 'Train End': dates[train_stop - 1],
+            'Test Start': dates[train_stop], 'Test End': dates[test_stop - 1],
+            'In-Sample Profit Ratio (%)': (train_value - initial_investment) / initial_investment * 100,
+            'Out-of-Sample Profit Ratio (%)': (test_value - capital) / capital * 100}
+
+
+def bollinger_walk_forward(stock_data, initial_investment, train_bars, test_bars, anchored=False,
+                           buy_portions=range(2, 21), sell_portions=range(2, 11), pipeline=default_pipeline):
+    # Optimizes (buy_portion, sell_portion) on each train window and trades the winner on the
+    # following test window. Bands and signals come from the full series (cached in the pipeline)
+    # and are only sliced per window; each test window starts in cash with the equity the
+    # previous one ended on. Returns (per-window DataFrame, stitched out-of-sample equity Series).
+    buy_portions, sell_portions = list(buy_portions), list(sell_portions)
+    close = stock_data['Close'].to_numpy(dtype=np.float64).reshape(-1)
+    signal = pipeline.signals(data_fingerprint(stock_data, SIGNAL_COLUMNS), close)
+    windows = walk_forward_windows(len(close), train_bars, test_bars, anchored)
+    sweeps = SweepCache(close, signal, initial_investment, buy_portions, sell_portions)
+    sweeps.sweep([(train_start, train_stop) for train_start, train_stop, _ in windows])
+
+    equity = np.full(len(close), np.nan)
+    capital = float(initial_investment)
+    rows = []
+    for train_start, train_stop, test_stop in windows:
+        final_values = sweeps.final_values(train_start, train_stop)
+        i, j = np.unravel_index(np.argmax(final_values), final_values.shape)
+
+        ledger = simulate_ledger(close[train_stop:test_stop], signal[train_stop:test_stop],
+                                 capital, buy_portions[i], sell_portions[j])
+        equity[train_stop:test_stop] = equity_curve(ledger, close[train_stop:test_stop], capital)
+
+        row = _window_row(stock_data.index, train_start, train_stop, test_stop, initial_investment,
+                          final_values[i, j], capital, equity[test_stop - 1])
+        rows.append({**row, 'Buy Portion': buy_portions[i], 'Sell Portion': sell_portions[j]})
+        capital = float(equity[test_stop - 1])
+
+    return pd.DataFrame(rows), pd.Series(equity, index=stock_data.index, name='Portfolio_Value').dropna()
+
+
+def breakout_walk_forward(stock_data, initial_investment, train_bars, test_bars, anchored=False,
+                          breakout_multipliers=np.arange(0.1, 0.9, 0.1)):
+    # Same walk-forward loop for the breakout k. The daily returns of every k are computed once
+    # and turned into prefix sums of log returns, so any window, overlapping or not, is scored
+    # with one subtraction per k.
+    breakout_multipliers = list(breakout_multipliers)
+    open_, high, low, close = (stock_data[column].to_numpy(dtype=np.float64).reshape(-1)
+                               for column in ('Open', 'High', 'Low', 'Close'))
+    ror = breakout_ror(open_, high, low, close, breakout_multipliers)
+    log_growth = np.zeros((len(breakout_multipliers), len(close) + 1))
+    np.cumsum(np.log(ror), axis=1, out=log_growth[:, 1:])
+
+    equity = np.full(len(close), np.nan)
+    capital = float(initial_investment)
+    rows = []
+    for train_start, train_stop, test_stop in walk_forward_windows(len(close), train_bars, test_bars, anchored):
+        train_values = initial_investment * np.exp(log_growth[:, train_stop] - log_growth[:, train_start])
+        best = int(np.argmax(train_values))
+
+        equity[train_stop:test_stop] = capital * np.cumprod(ror[best, train_stop:test_stop])
+
+        row = _window_row(stock_data.index, train_start, train_stop, test_stop, initial_investment,
+                          train_values[best], capital, equity[test_stop - 1])
+        rows.append({**row, 'Magic Number(k)': breakout_multipliers[best]})
+        capital = float(equity[test_stop - 1])
+
+    return pd.DataFrame(rows), pd.Series(equity, index=stock_data.index, name='Portfolio_Value').dropna()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backtest import bollinger, breakout  # noqa: E402
+from backtest.costs import ExecutionModel  # noqa: E402
+from backtest.engine import simulate_ledger, simulate_trades  # noqa: E402
+from backtest.pipeline import Pipeline  # noqa: E402
+from backtest.sweep import sweep_equity  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+MOVING_AVERAGE_PERIODS = [3, 5, 10, 20, 60, 120, 200]
+COSTS = ExecutionModel(commission_fixed=1, commission_bps=5, spread_bps=2, slippage_bps=1, fill='next_open')
+
+
+def synthetic_ohlcv(bars, seed=0):
+    # Geometric random walk with a daily range around the close; fixed seed keeps runs comparable
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    high = close * (1 + rng.uniform(0, 0.02, bars))
+    low = close * (1 - rng.uniform(0, 0.02, bars))
+    open_ = np.clip(close * (1 + rng.normal(0, 0.005, bars)), low, high)
+    index = pd.date_range('1990-01-01', periods=bars, freq='min', name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.integers(100_000, 1_000_000, bars).astype(float)}, index=index)
+
+
+def _fresh_pipeline(prices):
+    # Every timed call starts from an empty pipeline, so cached nodes never hide the work
+    return prices, Pipeline()
+
+
+def _signals(prices):
+    close = prices['Close'].to_numpy()
+    return close, Pipeline().signals('bench', close), prices['Open'].to_numpy()
+
+
+# name -> (setup(prices) -> argument, benchmarked function(argument)); the code paths the apps and the CLI run
+BENCHMARKS = {
+    # Pipeline nodes behind the single-backtest views of main_bb.py and main_vb.py
+    'bollinger_add_stock_data': (_fresh_pipeline, lambda args: bollinger.add_stock_data(args[0], MOVING_AVERAGE_PERIODS, 1500000, 5, 4,
+                                                                                        pipeline=args[1])),
+    'bollinger_backtest_metrics': (_fresh_pipeline, lambda args: bollinger.backtest_metrics(args[0], 1500000, 5, 4, pipeline=args[1])),
+    'breakout_add_stock_data': (_fresh_pipeline, lambda args: breakout.simulate_trading(breakout.add_stock_data(args[0], 0.4, pipeline=args[1]),
+                                                                                        1500000)),
+    'breakout_backtest_metrics': (_fresh_pipeline, lambda args: breakout.backtest_metrics(args[0], 0.4, 1500000, pipeline=args[1])),
+    # Engine on a precomputed signal, frictionless and with a full cost model
+    'simulate_trades': (_signals, lambda args: simulate_trades(args[0], args[1], 1500000, 5, 4)),
+    'simulate_ledger_costs': (_signals, lambda args: simulate_ledger(args[0], args[1], 1500000, 5, 4, COSTS, args[2])),
+    # Sweeps: one background chunk of the app's Bollinger sweep (equity kept for metrics), the final-value
+    # grid the optimizer ranks, and the breakout k sweep
+    'sweep_equity_chunk': (_signals, lambda args: sweep_equity(args[0], args[1], 1500000, range(2, 6), range(2, 11))),
+    'multiple_backtest': (_fresh_pipeline, lambda args: bollinger.multiple_backtest(args[0], 1500000, pipeline=args[1])),
+    'breakout_k_sweep': (_fresh_pipeline, lambda args: breakout.multiple_backtest(args[0], 1500000, np.arange(0.01, 1.0, 0.01),
+                                                                                  pipeline=args[1])),
+}
+
+
+def measure(setup, func, prices, repeat):
+    timings = []
+    for _ in range(repeat):
+        argument = setup(prices)
+        start = time.perf_counter()
+        func(argument)
+        timings.append(time.perf_counter() - start)
+
+    # Separate traced run: tracemalloc slows the code down, so it never overlaps the timings
+    argument = setup(prices)
+    tracemalloc.start()
+    func(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds_min': min(timings), 'seconds_median': statistics.median(timings), 'peak_memory_bytes': peak}
+
+
+def run(sizes, names, repeat):
+    results = []
+    for bars in sizes:
+        prices = synthetic_ohlcv(bars)
+        for name in names:
+            setup, func = BENCHMARKS[name]
+            result = {'name': name, 'bars': bars, **measure(setup, func, prices, repeat)}
+            print(f"{name:<28} {bars:>9,} bars  {result['seconds_min'] * 1000:10.2f} ms  "
+                  f"{result['peak_memory_bytes'] / 2**20:8.1f} MiB", file=sys.stderr)
+            results.append(result)
+    return {
+        'environment': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'pandas': pd.__version__, 'machine': platform.machine()},
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # A benchmark regresses when its best time is more than `threshold` times the baseline's
+    baseline_times = {(r['name'], r['bars']): r['seconds_min'] for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        key = (result['name'], result['bars'])
+        if key not in baseline_times:
+            continue
+        ratio = result['seconds_min'] / baseline_times[key]
+        result['baseline_ratio'] = ratio
+        if ratio > threshold:
+            regressions.append(result)
+            print(f"REGRESSION {key[0]} @ {key[1]:,} bars: {ratio:.2f}x baseline", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark indicators, trade simulation and parameter sweeps.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', help="Baseline JSON report to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.only, args.repeat)
+    regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold) if args.compare else []
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from backtest.downsample import minmax_indices
+from backtest.instrument import count_cache
+
+MAX_BUCKETS = 1000  # at most ~2000 plotted points per series, plenty for a 10-inch chart
+MAX_IMAGES = 128
+
+_images = OrderedDict()
+_lock = threading.Lock()
+_local = threading.local()
+
+def downsample(stock_data, column, n_buckets=MAX_BUCKETS):
+    stock_data = stock_data.sort_index(ascending=True)
+    return stock_data.iloc[minmax_indices(stock_data[column].to_numpy(dtype=float), n_buckets)]
+
+def chart_key(name, *parts):
+    # Fingerprint of exactly what gets drawn: (downsampled) frames, arrays and plot options
+    digest = hashlib.blake2b(name.encode(), digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+            digest.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+def _figure(figsize):
+    # One reusable Figure per size and thread; it never goes through pyplot, so nothing is leaked
+    figures = getattr(_local, 'figures', None)
+    if figures is None:
+        figures = _local.figures = {}
+    if figsize not in figures:
+        figures[figsize] = Figure(figsize=figsize)
+    fig = figures[figsize]
+    fig.clear()
+    return fig
+
+def render_chart(key, draw, figsize=(10, 5), dpi=120):
+    with _lock:
+        if key in _images:
+            _images.move_to_end(key)
+            count_cache(hit=True)
+            return _images[key]
+    count_cache(hit=False)
+
+    fig = _figure(figsize)
+    draw(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    fig.clear()
+    image = buffer.getvalue()
+
+    with _lock:
+        _images[key] = image
+        while len(_images) > MAX_IMAGES:
+            _images.popitem(last=False)
+    return image
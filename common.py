@@ -0,0 +1,282 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import matplotlib.ticker as mtick
+from datetime import date, timedelta
+from functools import partial
+from uuid import uuid4
+
+from backtest.bars import INTERVALS
+from backtest.instrument import count_cache
+from backtest.loader import WATCHLIST
+from backtest.metrics import format_metrics
+from backtest.pipeline import data_fingerprint
+from backtest.robustness import METHODS, summarize
+from backtest.service import BacktestService, result_key
+from backtest.store import PriceStore
+from backtest.tables import EXPORT_FORMATS, export_bytes, page_count, table_fingerprint, table_page, to_arrow
+from charts import chart_key, downsample, render_chart
+
+# Sidebar, data loading and result widgets shared by the strategy apps
+
+RANK_COLUMNS = ['Final Portfolio Value', 'CAGR (%)', 'Sharpe', 'Sortino', 'Max Drawdown (%)']
+PAGE_SIZE = 500  # rows per page of a results table
+JOB_REFRESH_SECONDS = 1.0  # how often a running job's progress and partial result are redrawn
+
+@st.cache_resource
+def get_price_store():
+    return PriceStore()
+
+@st.cache_data(ttl=1200)  # Unit: seconds. never expire (default)
+def get_stock_data(ticker, start_date, end_date, interval='1d', dropna=False):
+    count_cache(hit=False)  # body only runs on an st.cache_data miss
+    stock_data = get_price_store().get(ticker, start_date, end_date, interval)
+    if dropna:
+        stock_data = stock_data.dropna(how='any')
+    return stock_data
+
+@st.cache_resource
+def get_backtest_service():
+    # One per server process, shared by every session
+    return BacktestService()
+
+def shared_result(name, stock_data, compute, *args, **kwargs):
+    # compute(stock_data, *args, **kwargs) runs once per distinct request across all sessions;
+    # identical requests in flight wait for the same job. args need a deterministic repr (no arrays).
+    stock_data = stock_data.sort_index()
+    key = result_key(name, data_fingerprint(stock_data), args, sorted(kwargs.items()))
+    return get_backtest_service().run(key, compute, stock_data, *args, **kwargs)
+
+def start_job(key, compute, chunks, combine, cleanup=None):
+    # A job this session cancelled, or saw fail, stays on its page (with Resume / Retry) until the
+    # session asks to resume; otherwise every session asking for the key follows the service's job
+    stopped = st.session_state.get(f'job_{key}')
+    if stopped is not None and not st.session_state.pop(f'resume_{key}', False):
+        return stopped
+    st.session_state.pop(f'job_{key}', None)
+    return get_backtest_service().start(key, compute, chunks, combine, cleanup)
+
+def start_shared_job(name, stock_data, compute, chunks, combine, *key_parts):
+    # Background counterpart of shared_result: compute(stock_data, chunk) runs chunk by chunk in the
+    # service's worker pool and every session asking for the same request follows the same job
+    stock_data = stock_data.sort_index()
+    key = result_key(name, data_fingerprint(stock_data), tuple(chunks), key_parts)
+    return start_job(key, lambda chunk: compute(stock_data, chunk), chunks, combine)
+
+def _session_id():
+    if '_session_id' not in st.session_state:
+        st.session_state['_session_id'] = uuid4().hex
+    return st.session_state['_session_id']
+
+def _request_resume(key):
+    st.session_state[f'resume_{key}'] = True
+
+def _leave_job(job):
+    # The job itself is only cancelled when no other session is still following it
+    st.session_state[f'job_{job.key}'] = job
+    job.unsubscribe(_session_id())
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def _job_progress(job, render, unit):
+    # Reruns on its own every JOB_REFRESH_SECONDS while the rest of the page stays as drawn
+    if job.wait(timeout=0):
+        st.rerun()  # a full run draws the final result together with its widgets
+    if st.session_state.get(f'job_{job.key}') is not job:
+        job.subscribe(_session_id())
+    st.progress(job.progress(), text=f"{job.completed} / {job.total} {unit} finished")
+    result = job.partial()
+    if result is not None:
+        render(result, False)
+
+def follow_job(job, render, unit='chunks'):
+    # Draws a background job once and returns: while it runs, a Cancel button plus a fragment that redraws
+    # the progress and render(partial result, False) on a timer; when it has finished, render(result, True)
+    # with its widgets. Closing the page or a rerun only stops the watching, not the job.
+    if job.status == 'running':
+        if st.session_state.get(f'job_{job.key}') is job:
+            # This session pressed Cancel; chunks already running still finish
+            st.info(f"Cancelling once the running {unit} finish." if job.cancelling else
+                    "Stopped following; the job keeps running for the other sessions following it.")
+            st.button("Resume", key=f'resume_{job.key}', on_click=_request_resume, args=(job.key,))
+        else:
+            job.subscribe(_session_id())
+            st.button("Cancel", key=f'cancel_{job.key}', on_click=_leave_job, args=(job,))
+        _job_progress(job, render, unit)
+        return
+
+    if job.status != 'done':
+        st.session_state[f'job_{job.key}'] = job
+    result = job.partial()
+    if result is not None:
+        render(result, True)
+    if job.status == 'cancelled':
+        st.warning(f"Cancelled after {job.completed} of {job.total} {unit}. Finished {unit} are checkpointed.")
+        st.button("Resume", key=f'resume_{job.key}', on_click=_request_resume, args=(job.key,))
+    elif job.status == 'failed':
+        st.error(f"Failed: {job.error}")
+        st.button("Retry", key=f'resume_{job.key}', on_click=_request_resume, args=(job.key,))
+
+def date_range_options(days=365):
+    today = date.today()
+    default_start_date = today - timedelta(days=days)
+
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", default_start_date)
+    with col2:
+        end_date = st.date_input("End Date", today)
+
+    if start_date > today or end_date > today or start_date > end_date:
+        st.sidebar.error("Invalid date selection.")
+        start_date = default_start_date
+        end_date = today
+    return start_date, end_date
+
+def data_options(interval_help):
+    ticker = st.sidebar.selectbox("Select Stock Ticker", WATCHLIST, index=0)
+    start_date, end_date = date_range_options()
+    interval = st.sidebar.selectbox("Bar Interval", list(INTERVALS), index=list(INTERVALS).index('1d'), help=interval_help)
+    return ticker, start_date, end_date, interval
+
+def walk_forward_options():
+    show_walk_forward = st.sidebar.checkbox("Show Walk-Forward Results", value=False, help="Optimize on each train window and trade the winner on the following test window.")
+    if not show_walk_forward:
+        return None
+    with st.sidebar.expander("### Walk-Forward Options", expanded=True):
+        train_bars = st.number_input("Train Window (bars)", min_value=20, value=120, step=10)
+        test_bars = st.number_input("Test Window (bars)", min_value=1, value=20, step=5)
+        anchored = st.checkbox("Anchored Train Windows", value=False, help="Every train window starts at the first bar instead of rolling forward.")
+    return train_bars, test_bars, anchored
+
+def robustness_options():
+    show_robustness = st.sidebar.checkbox("Show Monte Carlo Robustness", value=False, help="Rerun the strategy on synthetic price paths built from the selected data.")
+    if not show_robustness:
+        return None
+    with st.sidebar.expander("### Monte Carlo Options", expanded=True):
+        n_paths = st.number_input("Number of Paths", min_value=100, max_value=20000, value=1000, step=100)
+        method = st.selectbox("Path Generator", METHODS, index=0, help="bootstrap: resampled blocks of historical bars, gbm: geometric Brownian motion fitted to the returns.")
+        block = st.number_input("Bootstrap Block Length (bars)", min_value=1, value=20, step=1)
+    return n_paths, method, block
+
+def sidebar_footer():
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>Coded by Mathilda</p>", unsafe_allow_html=True)
+    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>@2024</p>", unsafe_allow_html=True)
+
+def show_final_value(metrics):
+    final_portfolio_value, total_profit_ratio = metrics['Final Portfolio Value'], metrics['Total Profit Ratio (%)']
+    color = "hotpink" if total_profit_ratio > 0 else "blue"
+    st.markdown(f"<p style='font-size:18px; color:{color};'>Final Portfolio Amount : {final_portfolio_value:,.2f} ({total_profit_ratio:.2f}%)</p>", unsafe_allow_html=True)
+    st.markdown(f"<p style='font-size:14px;'>{format_metrics(metrics)}</p>", unsafe_allow_html=True)
+
+def highlight_rows(page_df, mask, color):
+    # Styler.apply(axis=None) callback: one CSS string per cell from a row mask in a single
+    # vectorized step, instead of a Python callback per row
+    css = np.where(mask, f'background-color:{color}', '')
+    return pd.DataFrame(np.repeat(css[:, None], page_df.shape[1], axis=1), index=page_df.index, columns=page_df.columns)
+
+def session_arrow_table(data, key):
+    # Converts a DataFrame to Arrow once per result: reruns passing the same frame, or an equal one
+    # (e.g. a fresh copy from st.cache_data), reuse the table kept in session state
+    if not isinstance(data, pd.DataFrame):
+        return to_arrow(data)
+    cached = st.session_state.get(f'arrow_{key}')
+    if cached is not None and cached[0] is data:
+        return cached[2]
+    fingerprint = table_fingerprint(data)
+    table = cached[2] if cached is not None and cached[1] == fingerprint else to_arrow(data)
+    st.session_state[f'arrow_{key}'] = (data, fingerprint, table)
+    return table
+
+def show_table(data, key, page_size=PAGE_SIZE, highlight=None, controls=True, **dataframe_options):
+    # The result stays one Arrow table; only the page on screen is converted to pandas and styled.
+    # highlight: (column, value), e.g. ('Profit Ranking', 1). controls=False draws the first page without widgets.
+    table = session_arrow_table(data, key)
+    pages = page_count(table, page_size)
+    page = 0
+    if controls and pages > 1:
+        page = st.number_input(f"Page (of {pages:,}, {table.num_rows:,} rows)", min_value=1, max_value=pages, value=1, key=f'page_{key}') - 1
+    page_df = table_page(table, page, page_size)
+    if highlight is not None:
+        column, value = highlight
+        page_df = page_df.style.apply(highlight_rows, axis=None, mask=page_df[column].to_numpy() == value, color='LightCyan')
+    st.dataframe(page_df, **dataframe_options)
+
+    if controls:
+        # Exports are only built when a button is clicked
+        for col, fmt in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS):
+            with col:
+                st.download_button(f"Download {fmt.title()}", partial(export_bytes, table, fmt), file_name=f'{key}.{fmt}',
+                                   mime='application/octet-stream', key=f'download_{fmt}_{key}')
+
+def generate_graph2(stock_data, key, show_trades=False):
+    sampled = downsample(stock_data[['Portfolio_Value']], 'Portfolio_Value')
+    positive_trades = negative_trades = None
+    if show_trades:
+        # Trade_Amount is signed (+ buy, - sell); with next-open fills it sits on the bar after the signal
+        positive_trades = stock_data.loc[stock_data['Trade_Amount'] > 0, ['Trade_Amount']]
+        negative_trades = stock_data.loc[stock_data['Trade_Amount'] < 0, ['Trade_Amount']]
+
+    def draw(fig):
+        ax = fig.subplots()
+        ax.plot(sampled.index, sampled['Portfolio_Value'], label='Total Asset Values')
+        ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))  # y-axis to integer
+
+        if show_trades:
+            ax.bar(positive_trades.index, positive_trades['Trade_Amount'], color='green', alpha=1, label='Buy Amount')
+            ax.bar(negative_trades.index, negative_trades['Trade_Amount'], color='red', alpha=1, label='Sell Amount')
+
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Amount')
+        ax.legend()
+        ax.grid(True)
+        ax.set_title('Portfolio Values Over Time')
+
+    st.image(render_chart(chart_key(key, sampled, positive_trades, negative_trades), draw), width='stretch')
+
+def show_walk_forward(windows_df, equity, key):
+    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Walk-Forward Results</p>", unsafe_allow_html=True)
+    if windows_df.empty:
+        st.info("Not enough bars for one train window and one test window.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.dataframe(windows_df, width=600, height=350)
+
+    with col2:
+        sampled = downsample(equity.to_frame(), 'Portfolio_Value')
+
+        def draw(fig):
+            ax = fig.subplots()
+            ax.plot(sampled.index, sampled['Portfolio_Value'], label='Out-of-Sample Asset Values')
+            ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))   # y-axis to integer
+            ax.set_title('Walk-Forward Out-of-Sample Portfolio Value')
+            ax.set_xlabel('Date')
+            ax.set_ylabel('Amount')
+            ax.legend()
+            ax.grid(True)
+
+        st.image(render_chart(chart_key(key, sampled), draw, figsize=(10, 6)), width='stretch')
+
+def show_robustness(results_df, n_paths, key):
+    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Monte Carlo Robustness ({n_paths:,} paths)</p>", unsafe_allow_html=True)
+    loss_probability = (results_df['Total Profit Ratio (%)'] < 0).mean() * 100
+    st.markdown(f"<p style='font-size:14px;'>Probability of Loss : {loss_probability:.1f}%</p>", unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.dataframe(summarize(results_df), width=600, height=300)
+
+    with col2:
+        def draw(fig):
+            ax1, ax2 = fig.subplots(1, 2)
+            ax1.hist(results_df['Total Profit Ratio (%)'], bins=50, color='MediumAquaMarine')
+            ax1.set_title('Total Profit Ratio (%)')
+            ax2.hist(results_df['Max Drawdown (%)'], bins=50, color='salmon')
+            ax2.set_title('Max Drawdown (%)')
+            for ax in (ax1, ax2):
+                ax.set_ylabel('Paths')
+                ax.grid(True)
+
+        st.image(render_chart(chart_key(key, results_df), draw, figsize=(10, 4)), width='stretch')
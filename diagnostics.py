@@ -0,0 +1,34 @@
+import importlib.util
+from contextlib import nullcontext
+
+import pandas as pd
+import streamlit as st
+
+from backtest.instrument import Recorder
+
+def diagnostics_options():
+    recorder = None
+    with st.sidebar.expander("### Diagnostics", expanded=False):
+        if not st.checkbox("Record Pipeline Timings", key="diagnostics", value=False):
+            return None
+        trace_memory = st.checkbox("Track Memory", key="trace_memory", value=False, help="Uses tracemalloc, which slows the rerun down.")
+        profilers = ["None", "cProfile"] + (["pyinstrument"] if importlib.util.find_spec("pyinstrument") else [])
+        profile = st.selectbox("Profile This Rerun", profilers, index=0)
+        recorder = Recorder(trace_memory=trace_memory, profile=None if profile == "None" else profile.lower())
+    return recorder
+
+def recording(recorder):
+    return recorder.activate() if recorder is not None else nullcontext()
+
+def show_diagnostics(recorder):
+    if recorder is None:
+        return
+    stages_df = pd.DataFrame(recorder.stages)
+    total_seconds = stages_df['seconds'].sum() if not stages_df.empty else 0.0
+    with st.expander(f"### Diagnostics ({total_seconds * 1000:,.0f} ms)", expanded=False):
+        if not stages_df.empty:
+            stages_df['ms'] = stages_df.pop('seconds') * 1000
+            st.dataframe(stages_df, width=1200)
+        st.download_button("Export JSON", recorder.to_json(), file_name="diagnostics.json", mime="application/json")
+        if recorder.profile_text:
+            st.code(recorder.profile_text, language=None)
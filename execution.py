@@ -0,0 +1,15 @@
+import streamlit as st
+
+from backtest.costs import FILLS, FRICTIONLESS, ExecutionModel
+
+def cost_options():
+    with st.sidebar.expander("### Execution Costs", expanded=False):
+        if not st.checkbox("Apply Execution Costs", key="apply_costs", value=False, help="Without costs every order fills at the close in whole shares for free."):
+            return FRICTIONLESS
+        commission_fixed = st.number_input("Commission per Order", min_value=0.0, value=0.0, step=1.0)
+        commission_bps = st.number_input("Commission (bps of value)", min_value=0.0, value=5.0, step=0.5)
+        spread_bps = st.number_input("Bid/Ask Spread (bps)", min_value=0.0, value=2.0, step=0.5, help="Buys pay half the spread above the fill price, sells give up half below it.")
+        slippage_bps = st.number_input("Slippage (bps)", min_value=0.0, value=1.0, step=0.5)
+        fill = st.selectbox("Fill Price", FILLS, index=0, help="close: the signal bar's close, next_open: the open of the following bar.")
+        fractional = st.checkbox("Fractional Shares", key="fractional", value=False)
+    return ExecutionModel(commission_fixed, commission_bps, spread_bps, slippage_bps, fractional, fill)
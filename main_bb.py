@@ -1,222 +1,123 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
+from functools import partial
 import matplotlib.ticker as mtick
-from datetime import date, timedelta
 
-@st.cache_data(ttl=1200)  # Unit: seconds. never expire (default)
-def get_stock_data(ticker, start_date, end_date):
-    stock_data = yf.download(ticker, start=start_date, end=end_date)
-    return stock_data
-
-@st.cache_data
-def calculate_moving_averages(stock_data, periods):
-    for period in periods:
-        stock_data[f'SMA_{period}'] = stock_data['Close'].rolling(window=period).mean()
-    return stock_data
-
-@st.cache_data
-def calculate_bollinger_bands(stock_data, window=20):
-    rolling_mean = stock_data['Close'].rolling(window=window).mean()
-    rolling_std = stock_data['Close'].rolling(window=window).std()
-    stock_data['BB_mid_20'] = rolling_mean
-    stock_data['BB_upper_20'] = rolling_mean + (rolling_std * 2)
-    stock_data['BB_lower_20'] = rolling_mean - (rolling_std * 2)
-    return stock_data
-
-def initialize_trade_columns(stock_data, initial_investment):
-    stock_data['Signal'] = 0
-    stock_data['Trade_Amount'] = 0.0
-    stock_data['Trade_Count'] = 0.0
-    stock_data['Shares_held'] = 0.0
-    stock_data['Portfolio_Value'] = float(initial_investment)
-    return stock_data
-
-@st.cache_data
-def calculate_signals(stock_data):
-    stock_data.loc[stock_data['Close'] < stock_data['BB_lower_20'], 'Signal'] = 1
-    stock_data.loc[stock_data['Close'] > stock_data['BB_upper_20'], 'Signal'] = -1
-    return stock_data
-
-@st.cache_data
-def calculate_backtest(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion):
-    stock_data = add_stock_data(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion)
-    stock_data = stock_data.sort_index(ascending=True)
-    
-    final_portfolio_value = stock_data['Portfolio_Value'].iloc[-1]
-    total_profit_ratio = (final_portfolio_value - initial_investment) / initial_investment * 100
-    return final_portfolio_value, total_profit_ratio
-
-@st.cache_data
-def add_stock_data(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion):
-    stock_data = calculate_moving_averages(stock_data, moving_average_periods)
-    stock_data = calculate_bollinger_bands(stock_data)
-    
-    stock_data = initialize_trade_columns(stock_data, initial_investment)
-    stock_data = calculate_signals(stock_data)
-    stock_data = process_trades(stock_data, initial_investment, buy_portion, sell_portion)    
-    return stock_data
-
-@st.cache_data
-def process_trades(stock_data, initial_investment, buy_portion, sell_portion):
-    total_money = initial_investment
-    trade_money = initial_investment // buy_portion
-    shares = 0
-    
-    for index, row in stock_data.iterrows():
-        # Buy signal
-        if row['Signal'] == 1 and trade_money > row['Close'] and total_money >= trade_money:
-            shares_bought = trade_money // row['Close']
-            total_money -= shares_bought * row['Close']
-            shares += shares_bought
-            stock_data.at[index, 'Trade_Amount'] = shares_bought * row['Close'] # Show shares bought
-            stock_data.at[index, 'Trade_Count'] = shares_bought  # Show shares bought in this trade
-        
-        # Sell signal
-        elif row['Signal'] == -1 and shares > 0:
-            shares_to_sell = shares // sell_portion
-            if shares_to_sell > 0:
-                sell_amount = shares_to_sell * row['Close']
-                total_money += sell_amount
-                shares -= shares_to_sell
-                stock_data.at[index, 'Trade_Amount'] = -sell_amount  # Show shares sold
-                stock_data.at[index, 'Trade_Count'] = shares_to_sell  # Show shares sold in this trade
-        
-        # Update shares held and portfolio value
-        stock_data.at[index, 'Shares_held'] = shares
-        stock_data.at[index, 'Portfolio_Value'] = shares * row['Close'] + total_money
-        
-    return stock_data
-
-def plot_moving_averages(stock_data, periods):
+from backtest.bollinger import add_stock_data, backtest_metrics, multiple_backtest
+from backtest.costs import FRICTIONLESS
+from backtest.instrument import stage
+from backtest.metrics import periods_per_year
+from backtest.optimizer import BOLLINGER
+from backtest.robustness import monte_carlo
+from backtest.service import chunked, concat_ranked
+from backtest.walkforward import bollinger_walk_forward
+from charts import chart_key, downsample, render_chart
+from common import (RANK_COLUMNS, data_options, follow_job, generate_graph2, get_stock_data, robustness_options, shared_result, show_final_value,
+                    show_robustness, show_table, show_walk_forward, sidebar_footer, start_shared_job, walk_forward_options)
+from execution import cost_options
+from diagnostics import diagnostics_options, recording, show_diagnostics
+
+SWEEP_CHUNK = 4  # buy portions per background chunk
+
+def plot_moving_averages(ax, stock_data, periods):
     colors = ['blue', 'green', 'red', 'orange', 'purple', 'brown']
     for i, period in enumerate(periods):
         color = colors[i % len(colors)]  # Cycle through colors
-        plt.plot(stock_data.index, stock_data[f'SMA_{period}'], label=f'SMA {period}', color=color)
+        ax.plot(stock_data.index, stock_data[f'SMA_{period}'], label=f'SMA {period}', color=color)
 
-def plot_bollinger_bands(stock_data, show_bollinger):
+def plot_bollinger_bands(ax, stock_data, show_bollinger):
     if show_bollinger:
         valid_data = stock_data.dropna(subset=['BB_upper_20', 'BB_lower_20'])
-        plt.fill_between(
+        ax.fill_between(
             valid_data.index, valid_data['BB_upper_20'], valid_data['BB_lower_20'], 
             color='blue', alpha=0.1, label='Bollinger Bands (20-day)'
         )
 
-def plot_signals(stock_data, show_buy_timing, show_sell_timing):
-    if show_buy_timing:
-        buy_signals = stock_data[stock_data['Signal'] == 1]
-        plt.plot(buy_signals.index, buy_signals['Close'], '^', markersize=10, color='red', label='Buy Signal')
+def plot_signals(ax, buy_signals, sell_signals):
+    if buy_signals is not None:
+        ax.plot(buy_signals.index, buy_signals['Close'], '^', markersize=10, color='red', label='Buy Signal')
 
-    if show_sell_timing:
-        sell_signals = stock_data[stock_data['Signal'] == -1]
-        plt.plot(sell_signals.index, sell_signals['Close'], 'v', markersize=10, color='blue', label='Sell Signal')
+    if sell_signals is not None:
+        ax.plot(sell_signals.index, sell_signals['Close'], 'v', markersize=10, color='blue', label='Sell Signal')
 
-@st.cache_data
 def generate_graph(stock_data, moving_average_periods, show_bollinger, show_buy_timing, show_sell_timing):
-    plt.figure(figsize=(10, 5))
-    plt.plot(stock_data.index, stock_data['Close'], label='Close Price', color='black')
-    
-    plot_moving_averages(stock_data, moving_average_periods)
-    plot_bollinger_bands(stock_data, show_bollinger)
-    plot_signals(stock_data, show_buy_timing, show_sell_timing)
-    
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend(fontsize=8)
-    plt.grid(True, axis='y')
-    plt.title('Stock Price with SMA')   
-    st.pyplot(plt)
-
-@st.cache_data
-def generate_graph2(stock_data):
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.plot(stock_data.index, stock_data['Portfolio_Value'], label='Total Asset Values')
-    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))  # y-axis to integer
-    
-    positive_trades = stock_data[stock_data['Trade_Amount'] * stock_data['Signal'] > 0]
-    ax.bar(positive_trades.index, positive_trades['Trade_Amount'], color='green', alpha=1, label='Buy Amount')
-    
-    negative_trades = stock_data[stock_data['Trade_Amount'] * stock_data['Signal'] < 0]
-    ax.bar(negative_trades.index, negative_trades['Trade_Amount'], color='red', alpha=1, label='Sell Amount')
-    
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Amount')
-    ax.legend()
-    ax.grid(True)
-    plt.title('Portfolio Values Over Time')
-    st.pyplot(fig)
-
-@st.cache_data
-def generate_multiple_backtest(stock_data, moving_average_periods, initial_investment):
-    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Backtesting Results</p>", unsafe_allow_html=True)
-    
+    # Lines are min/max-decimated; markers stay exact since signal bars are sparse
+    columns = ['Close'] + [f'SMA_{period}' for period in moving_average_periods] + (['BB_upper_20', 'BB_lower_20'] if show_bollinger else [])
+    sampled = downsample(stock_data[columns], 'Close')
+    buy_signals = stock_data.loc[stock_data['Signal'] == 1, ['Close']] if show_buy_timing else None
+    sell_signals = stock_data.loc[stock_data['Signal'] == -1, ['Close']] if show_sell_timing else None
+    
+    def draw(fig):
+        ax = fig.subplots()
+        ax.plot(sampled.index, sampled['Close'], label='Close Price', color='black')
+        
+        plot_moving_averages(ax, sampled, moving_average_periods)
+        plot_bollinger_bands(ax, sampled, show_bollinger)
+        plot_signals(ax, buy_signals, sell_signals)
+        
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Price')
+        ax.legend(fontsize=8)
+        ax.grid(True, axis='y')
+        ax.set_title('Stock Price with SMA')
+    
+    key = chart_key('price', sampled, buy_signals, sell_signals, moving_average_periods, show_bollinger)
+    st.image(render_chart(key, draw), width='stretch')
+
+def show_multiple_backtest(results_df, final=True):
     col1, col2 = st.columns(2)
     with col1:
-        results = []
-
-        # Loop through buy and sell portions
-        for buy_portion in range(2, 21):  # from 2 to 20
-            for sell_portion in range(2, 11):  # from 2 to 10
-                final_portfolio_value2, total_profit_ratio2 = calculate_backtest(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion)
-                results.append({
-                    'Buy Portion': buy_portion,
-                    'Sell Portion': sell_portion,
-                    'Final Portfolio Value': final_portfolio_value2,
-                    'Total Profit Ratio (%)': total_profit_ratio2
-                })
-
-        # Convert the list to a DataFrame
-        results_df = pd.DataFrame(results)
-
-        # Final Portfolio Value sort descending, add ranking
-        results_df['Profit Ranking'] = results_df['Final Portfolio Value'].rank(ascending=False, method='min').astype(int)
         # results_df = results_df.sort_values(by='Final Portfolio Value', ascending=False)
         
-        styled_df = results_df.style.apply(
-            lambda row: ['background-color:LightCyan'] * len(row) if row['Profit Ranking'] == 1 else [''] * len(row),
-            axis=1
-        )
-        
-        st.write(styled_df)
+        show_table(results_df, 'bollinger_sweep', highlight=('Profit Ranking', 1), controls=final)
         
     with col2:
-        plt.figure(figsize=(10, 6))
-        for key, grp in results_df.groupby('Sell Portion'):
-            plt.plot(grp['Buy Portion'], grp['Final Portfolio Value'], label=f'Sell Portion {key}', marker='o')
-        
-        plt.gca().yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))   # y-axis to integer
+        def draw(fig):
+            ax = fig.subplots()
+            for key, grp in results_df.groupby('Sell Portion'):
+                ax.plot(grp['Buy Portion'], grp['Final Portfolio Value'], label=f'Sell Portion {key}', marker='o')
+            
+            ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))   # y-axis to integer
+            
+            ax.set_title('Final Portfolio Value by Buy and Sell Portion Units')
+            ax.set_xlabel('Buy Portion Unit')
+            ax.set_ylabel('Final Portfolio Value')
+            ax.legend(title='Sell Portion Unit')
+            ax.grid(True)
         
-        plt.title('Final Portfolio Value by Buy and Sell Portion Units')
-        plt.xlabel('Buy Portion Unit')
-        plt.ylabel('Final Portfolio Value')
-        plt.legend(title='Sell Portion Unit')
-        plt.grid(True)
-        st.pyplot(plt)
+        st.image(render_chart(chart_key('sweep', results_df), draw, figsize=(10, 6)), width='stretch')
+
+def generate_multiple_backtest(stock_data, initial_investment, buy_portions=range(2, 21), sell_portions=range(2, 11), rank_by='Final Portfolio Value', interval='1d', costs=FRICTIONLESS):
+    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Backtesting Results</p>", unsafe_allow_html=True)
+    # Runs in the background a few buy portions at a time, shared between sessions; the table fills in as rows finish
+    def compute(stock_data, buy_chunk):
+        return multiple_backtest(stock_data, initial_investment, buy_chunk, sell_portions,
+                                 metrics=True, rank_by=rank_by, periods_per_year=periods_per_year(interval), costs=costs)
+    job = start_shared_job('bollinger_sweep', stock_data, compute, chunked(buy_portions, SWEEP_CHUNK), partial(concat_ranked, rank_by=rank_by),
+                           initial_investment, tuple(sell_portions), rank_by, interval, costs)
+    follow_job(job, show_multiple_backtest, unit='buy portion batches')
+
+def generate_walk_forward(stock_data, initial_investment, train_bars, test_bars, anchored, buy_portions, sell_portions):
+    windows_df, equity = shared_result('bollinger_walk_forward', stock_data, bollinger_walk_forward, initial_investment,
+                                       train_bars, test_bars, anchored, buy_portions, sell_portions)
+    show_walk_forward(windows_df, equity, 'walk_forward')
+
+def generate_robustness(stock_data, params, initial_investment, n_paths, method, block, costs=FRICTIONLESS):
+    results_df = shared_result('monte_carlo', stock_data, monte_carlo, BOLLINGER, params, initial_investment, n_paths, method, block, seed=0, costs=costs)
+    show_robustness(results_df, n_paths, 'robustness')
 
 def sidebar_options():
-    ticker = st.sidebar.selectbox(
-        "Select Stock Ticker", 
-        ["TQQQ", "QQQ", "SOXL", "SOXX", "GOOGL", "MSFT", "AAPL", "NVDA", "AMZN"],
-        index=0
-    )
-    
-    today = date.today()
-    default_start_date = today - timedelta(days=365)
-    
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        start_date = st.date_input("Start Date", default_start_date)
-    with col2:
-        end_date = st.date_input("End Date", today)
-        
-    if start_date > today or end_date > today or start_date > end_date:
-        st.sidebar.error("Invalid date selection.")
-        start_date = default_start_date
-        end_date = today
+    ticker, start_date, end_date, interval = data_options("Intraday history is limited by Yahoo: 30 days for 1m, 60 days for 5m/15m, 2 years for 1h.")
         
     show_dataset_asecending = st.sidebar.checkbox("Show Dataset Ascending", value=True)
     show_multiple_backtest = st.sidebar.checkbox("Show Multiple Backtesting Results", value=False)
+    max_buy_portion, max_sell_portion, rank_by = 20, 10, RANK_COLUMNS[0]
+    if show_multiple_backtest:
+        with st.sidebar.expander("### Multiple Backtesting Options", expanded=False):
+            max_buy_portion = st.number_input("Max Buy Portion", min_value=2, value=20, step=1)
+            max_sell_portion = st.number_input("Max Sell Portion", min_value=2, value=10, step=1)
+            rank_by = st.selectbox("Rank By", RANK_COLUMNS, index=0)
+    walk_forward = walk_forward_options()
+    robustness = robustness_options()
     show_bollinger = st.sidebar.checkbox("Show Bollinger Bands", value=True)
     
     show_buy_timing, show_sell_timing = False, False        
@@ -235,14 +136,16 @@ def sidebar_options():
     buy_portion = st.sidebar.number_input("Buy Portion(5 = 100/5 = 20%)", min_value=1, value=5, step=1)
     sell_portion = st.sidebar.number_input(" Sell Portion(4 = 100/4 = 25%)", min_value=1, value=4, step=1)
         
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>Coded by Mathilda</p>", unsafe_allow_html=True)
-    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>@2024</p>", unsafe_allow_html=True)
+    costs = cost_options()
+    recorder = diagnostics_options()
     
-    return (ticker, start_date, end_date, show_dataset_asecending, 
+    sidebar_footer()
+    
+    return (ticker, start_date, end_date, interval, show_dataset_asecending, 
             show_bollinger, show_buy_timing, show_sell_timing, 
             moving_average_periods, 
-            initial_investment, buy_portion, sell_portion, show_multiple_backtest)
+            initial_investment, buy_portion, sell_portion, show_multiple_backtest,
+            max_buy_portion, max_sell_portion, rank_by, walk_forward, robustness, costs, recorder)
 
 def main():
     st.set_page_config(page_title="Stock Price Viewer", page_icon="📈", layout='wide')
@@ -251,43 +154,67 @@ def main():
     sidebar_result = sidebar_options()
     
     if sidebar_result is not None:
-        (ticker, start_date, end_date, show_dataset_asecending, 
+        (ticker, start_date, end_date, interval, show_dataset_asecending, 
         show_bollinger, show_buy_timing, show_sell_timing, 
         moving_average_periods, 
-        initial_investment, buy_portion, sell_portion, show_multiple_backtest) = sidebar_result
-        
-        stock_data_orig = get_stock_data(ticker, start_date, end_date)
-        stock_data = stock_data_orig.drop(columns=['Open', 'High', 'Low'])
-        print(stock_data)
-
-        stock_data = add_stock_data(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion)
-        stock_data = stock_data.sort_index(ascending=show_dataset_asecending)
-        
-        st.dataframe(stock_data, width=1200, height=400)
-        
-        final_portfolio_value = stock_data.sort_values(by='Date', ascending=True)['Portfolio_Value'].iloc[-1]
-        total_profit_ratio = (final_portfolio_value - initial_investment) / initial_investment * 100
-        color = "hotpink" if total_profit_ratio > 0 else "blue"
-        st.markdown(f"<p style='font-size:18px; color:{color};'>Final Portfolio Amount : {final_portfolio_value:,.2f} ({total_profit_ratio:.2f}%)</p>", unsafe_allow_html=True)
-        
-        col1, col2 = st.columns(2)
-        
-        # col1_expanded_flag = col2_expanded_flag = not show_multiple_backtest        
-        if show_multiple_backtest:
-            col1_expanded_flag, col2_expanded_flag = False, False
-        else:
-            col1_expanded_flag, col2_expanded_flag = True, True
+        initial_investment, buy_portion, sell_portion, show_multiple_backtest,
+        max_buy_portion, max_sell_portion, rank_by, walk_forward, robustness, costs, recorder) = sidebar_result
+        
+        with recording(recorder):
+            with stage('get_stock_data', cached=True) as record:
+                stock_data_orig = get_stock_data(ticker, start_date, end_date, interval)
+                record['rows'] = len(stock_data_orig)
+            # Next-open fills need the Open column
+            stock_data = stock_data_orig.drop(columns=['High', 'Low'] if costs.fill == 'next_open' else ['Open', 'High', 'Low'])
+            print(stock_data)
+
+            with stage('add_stock_data') as record:
+                metrics = backtest_metrics(stock_data, initial_investment, buy_portion, sell_portion, periods_per_year(interval), costs=costs)
+                stock_data = add_stock_data(stock_data, moving_average_periods, initial_investment, buy_portion, sell_portion, costs=costs)
+                stock_data = stock_data.sort_index(ascending=show_dataset_asecending)
+                record['rows'] = len(stock_data)
+        
+            with stage('st.dataframe'):
+                show_table(stock_data, 'stock_data', width=1200, height=400)
+        
+            show_final_value(metrics)
+        
+            col1, col2 = st.columns(2)
+        
+            # col1_expanded_flag = col2_expanded_flag = not show_multiple_backtest        
+            if show_multiple_backtest:
+                col1_expanded_flag, col2_expanded_flag = False, False
+            else:
+                col1_expanded_flag, col2_expanded_flag = True, True
             
-        with col1:
-            with st.expander("### Show Graph : Stock Price with Moving Averages", expanded=col1_expanded_flag):
-                generate_graph(stock_data, moving_average_periods, show_bollinger, show_buy_timing, show_sell_timing)
-
-        with col2:
-            with st.expander("### Show Graph : Total Asset Change", expanded=col2_expanded_flag):
-                generate_graph2(stock_data)
-        
-        if show_multiple_backtest:
-            generate_multiple_backtest(stock_data, moving_average_periods, initial_investment)
+            with col1:
+                with st.expander("### Show Graph : Stock Price with Moving Averages", expanded=col1_expanded_flag):
+                    with stage('generate_graph'):
+                        generate_graph(stock_data, moving_average_periods, show_bollinger, show_buy_timing, show_sell_timing)
+
+            with col2:
+                with st.expander("### Show Graph : Total Asset Change", expanded=col2_expanded_flag):
+                    with stage('generate_graph2'):
+                        generate_graph2(stock_data, 'portfolio', show_trades=True)
+        
+            if show_multiple_backtest:
+                with stage('generate_multiple_backtest', cached=True) as record:
+                    generate_multiple_backtest(stock_data, initial_investment,
+                                               range(2, max_buy_portion + 1), range(2, max_sell_portion + 1), rank_by, interval, costs)
+                    record['rows'] = (max_buy_portion - 1) * (max_sell_portion - 1)
+
+            if walk_forward is not None:
+                with stage('generate_walk_forward', cached=True):
+                    generate_walk_forward(stock_data_orig.sort_index(), initial_investment, *walk_forward,
+                                          range(2, max_buy_portion + 1), range(2, max_sell_portion + 1))
+
+            if robustness is not None:
+                with stage('generate_robustness', cached=True) as record:
+                    generate_robustness(stock_data_orig.sort_index(), {'buy_portion': buy_portion, 'sell_portion': sell_portion},
+                                        initial_investment, *robustness, costs)
+                    record['rows'] = robustness[0]
+
+        show_diagnostics(recorder)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
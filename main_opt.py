@@ -0,0 +1,75 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+from datetime import timedelta
+
+from backtest.loader import WATCHLIST
+from backtest.optimizer import BOLLINGER, BREAKOUT, OptimizationPool, rank_results
+from backtest.pipeline import data_fingerprint
+from backtest.service import result_key
+from backtest.tables import to_arrow
+from common import date_range_options, follow_job, get_stock_data, show_table, sidebar_footer, start_job
+
+
+def split_date_range(start_date, end_date, window_count):
+    edges = pd.date_range(start_date, end_date, periods=window_count + 1)
+    return [(edges[i].date(), (edges[i + 1] - timedelta(days=1)).date() if i < window_count - 1 else end_date)
+            for i in range(window_count)]
+
+def start_optimization(price_data, date_windows, strategy_params, initial_investment, rank_by):
+    # One background chunk per ticker, shared between sessions and resumable ticker by ticker. Every chunk
+    # runs on the same worker pool and shared price block, started by the first chunk and closed with the job
+    key = result_key('optimization', [(ticker, data_fingerprint(stock_data.sort_index())) for ticker, stock_data in price_data.items()],
+                     tuple(date_windows), repr(strategy_params), initial_investment, rank_by)
+    pool = OptimizationPool(price_data)
+    return start_job(key, lambda ticker: to_arrow(list(pool.run([ticker], date_windows, strategy_params, initial_investment))),
+                     list(price_data), lambda tables: rank_results(tables, rank_by), cleanup=pool.close)
+
+def sidebar_options():
+    tickers = st.sidebar.multiselect("Select Stock Tickers", WATCHLIST, default=WATCHLIST)
+    
+    start_date, end_date = date_range_options(days=365 * 5)
+
+    window_count = st.sidebar.number_input("Number of Date Windows", min_value=1, value=5, step=1)
+    initial_investment = st.sidebar.number_input("Initial Investment Amount", min_value=0, value=1500000, step=10000)
+    rank_by = st.sidebar.selectbox("Rank By", ['Total Profit Ratio (%)', 'CAGR (%)', 'Sharpe', 'Sortino', 'Max Drawdown (%)'], index=0)
+    
+    strategy_params = {}
+    with st.sidebar.expander("### Bollinger Bands Options", expanded=True):
+        if st.checkbox("Optimize Bollinger Bands Strategy", value=True):
+            max_buy_portion = st.number_input("Max Buy Portion", min_value=2, value=20, step=1)
+            max_sell_portion = st.number_input("Max Sell Portion", min_value=2, value=10, step=1)
+            strategy_params[BOLLINGER] = {'buy_portions': list(range(2, max_buy_portion + 1)),
+                                          'sell_portions': list(range(2, max_sell_portion + 1))}
+    with st.sidebar.expander("### Volatility Breakout Options", expanded=True):
+        if st.checkbox("Optimize Volatility Breakout Strategy", value=True):
+            k_min, k_max = st.slider("Breakout Multiplier(k) Range", min_value=0.0, max_value=1.0, value=(0.1, 0.8), step=0.05)
+            k_step = st.number_input("Breakout Multiplier(k) Step", min_value=0.01, value=0.1, step=0.01)
+            strategy_params[BREAKOUT] = {'breakout_multipliers': np.round(np.arange(k_min, k_max + k_step / 2, k_step), 4).tolist()}
+
+    sidebar_footer()
+    
+    return tickers, start_date, end_date, window_count, initial_investment, rank_by, strategy_params
+
+def main():
+    st.set_page_config(page_title="Strategy Optimizer", page_icon="📈", layout='wide')
+    st.title("📈 Stock Investment Simulator (Strategy Optimizer)")
+    
+    tickers, start_date, end_date, window_count, initial_investment, rank_by, strategy_params = sidebar_options()
+    date_windows = split_date_range(start_date, end_date, window_count)
+    
+    if not tickers or not strategy_params:
+        st.info("Select at least one ticker and one strategy.")
+        return
+    
+    request = (tuple(tickers), start_date, end_date, tuple(date_windows), initial_investment, rank_by, repr(strategy_params))
+    if st.button("Run Optimization"):
+        st.session_state['optimization'] = request
+    # Keep following the started job across reruns until the sidebar changes
+    if st.session_state.get('optimization') == request:
+        price_data = {ticker: get_stock_data(ticker, start_date, end_date, dropna=True) for ticker in tickers}
+        job = start_optimization(price_data, date_windows, strategy_params, initial_investment, rank_by)
+        follow_job(job, lambda results_df, final: show_table(results_df, 'optimization', controls=final, width=1200, height=400), unit='tickers')
+
+if __name__ == "__main__":
+    main()
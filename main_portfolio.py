@@ -0,0 +1,86 @@
+import streamlit as st
+import matplotlib.ticker as mtick
+import pandas as pd
+
+from backtest.loader import WATCHLIST
+from backtest.portfolio import ALLOCATIONS, bollinger_portfolio, breakout_portfolio
+from charts import chart_key, downsample, render_chart
+from common import date_range_options, get_stock_data, show_table, sidebar_footer
+
+
+def sidebar_options():
+    tickers = st.sidebar.multiselect("Select Stock Tickers", WATCHLIST, default=WATCHLIST)
+    
+    start_date, end_date = date_range_options(days=365 * 5)
+    
+    strategy = st.sidebar.radio("Strategy", ["Bollinger Bands", "Volatility Breakout"])
+    initial_investment = st.sidebar.number_input("Initial Investment Amount", min_value=0, value=1500000, step=10000)
+    allocation = st.sidebar.selectbox("Allocation", ALLOCATIONS, index=0, help="How a bar's budget is split between tickers signalling at the same time.")
+    max_weight = st.sidebar.slider("Max Weight per Ticker", min_value=0.05, max_value=1.0, value=1.0, step=0.05)
+    
+    params = {}
+    if strategy == "Bollinger Bands":
+        params['buy_portion'] = st.sidebar.number_input("Buy Portion(5 = 100/5 = 20%)", min_value=1, value=5, step=1)
+        params['sell_portion'] = st.sidebar.number_input(" Sell Portion(4 = 100/4 = 25%)", min_value=1, value=4, step=1)
+        params['rebalance_every'] = st.sidebar.number_input("Rebalance Every N Bars (0 = never)", min_value=0, value=0, step=1)
+    else:
+        params['breakout_multiplier'] = st.sidebar.slider("Breakout Multiplier(k)", min_value=0.0, max_value=1.0, value=0.5, step=0.05)
+
+    sidebar_footer()
+    
+    return tickers, start_date, end_date, strategy, initial_investment, allocation, max_weight, params
+
+def generate_graph(summary):
+    sampled = downsample(summary[['Portfolio_Value']], 'Portfolio_Value')
+    
+    def draw(fig):
+        ax = fig.subplots()
+        ax.plot(sampled.index, sampled['Portfolio_Value'], label='Total Asset Values')
+        ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))  # y-axis to integer
+        
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Amount')
+        ax.legend()
+        ax.grid(True)
+        ax.set_title('Portfolio Values Over Time')
+    
+    st.image(render_chart(chart_key('portfolio_book', sampled), draw), width='stretch')
+
+def main():
+    st.set_page_config(page_title="Portfolio Backtest", page_icon="📈", layout='wide')
+    st.title("📈 Stock Investment Simulator (Portfolio Backtest)")
+    
+    tickers, start_date, end_date, strategy, initial_investment, allocation, max_weight, params = sidebar_options()
+    
+    if not tickers:
+        st.info("Select at least one ticker.")
+        return
+    
+    price_data = {ticker: get_stock_data(ticker, start_date, end_date, dropna=True) for ticker in tickers}
+    price_data = {ticker: data for ticker, data in price_data.items() if not data.empty}
+    if not price_data:
+        st.warning("No price data for the selected tickers in this date range.")
+        return
+    
+    if strategy == "Bollinger Bands":
+        summary, ledger, tickers = bollinger_portfolio(price_data, initial_investment, allocation=allocation, max_weight=max_weight, **params)
+        trades = pd.DataFrame({'Date': summary.index[ledger['bar']], 'Ticker': [tickers[i] for i in ledger['asset']],
+                               'Shares': ledger['shares'], 'Price': ledger['price']})
+    else:
+        summary, weights, tickers = breakout_portfolio(price_data, initial_investment, allocation=allocation, max_weight=max_weight, **params)
+        trades = pd.DataFrame(weights, index=summary.index, columns=tickers)
+        trades = trades.loc[trades.sum(axis=1) > 0]
+    
+    final_portfolio_value = summary['Portfolio_Value'].iloc[-1]
+    total_profit_ratio = (final_portfolio_value - initial_investment) / initial_investment * 100
+    color = "hotpink" if total_profit_ratio > 0 else "blue"
+    st.markdown(f"<p style='font-size:18px; color:{color};'>Final Portfolio Amount : {final_portfolio_value:,.2f} ({total_profit_ratio:.2f}%)</p>", unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        generate_graph(summary)
+    with col2:
+        show_table(trades, 'trades', width=1200, height=400)
+
+if __name__ == "__main__":
+    main()
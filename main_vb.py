@@ -1,170 +1,105 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
-from datetime import date, timedelta
-
-@st.cache_data(ttl=1200)  # Unit: seconds. never expire (default)
-def get_stock_data(ticker, start_date, end_date):
-    stock_data = yf.download(ticker, start=start_date, end=end_date)
-    stock_data = stock_data.dropna(how='any')
-    return stock_data
-
-def calculate_atr(stock_data, breakout_multiplier):
-    ##### Calculate Target Price #####
-    # 1) High-Low Volatility
-    stock_data['Range'] = stock_data['High'] - stock_data['Low'] 
-    stock_data['k'] = breakout_multiplier
-
-    # 2) Shift the target price down by one (shift), then calculate the target price by multiplying by k value
-    stock_data['Target'] = stock_data['Open'] + stock_data['Range'].shift(1) * breakout_multiplier
-        
-    ##### Buy Simulation #####
-    # If the day's high price df['High'] is greater than df['Target'], it means the target price has been broken upward, so we add df['Close'] / df['Target'] to df['ror']
-    # If df['High'] is less than df['Target'], it means the target price was never broken during the day, so we add 1 to df['ror']
-    stock_data['Buy'] = stock_data['High'] > stock_data['Target']
-    stock_data['ror'] = np.where(stock_data['High'] > stock_data['Target'], stock_data['Close'] / stock_data['Target'], 1)  
-
-    # Calculate Final Cumulative
-    stock_data['Profit'] = stock_data['ror'].cumprod()
-
-    return stock_data
-
-def initialize_trade_columns(stock_data, initial_investment):
-    stock_data['Signal'] = 0
-    stock_data['Trade_Amount'] = 0.0
-    stock_data['Trade_Count'] = 0.0
-    stock_data['Shares_held'] = 0.0
-    stock_data['Portfolio_Value'] = float(initial_investment)
-    return stock_data
-
-@st.cache_data
-def calculate_backtest(stock_data, breakout_multiplier, initial_investment):
-    stock_data = add_stock_data(stock_data, breakout_multiplier)
-    stock_data = simulate_trading(stock_data, initial_investment)
-    stock_data = stock_data.sort_index(ascending=True)
-    final_portfolio_value = stock_data['Portfolio_Value'].iloc[-1]
-    total_profit_ratio = (final_portfolio_value - initial_investment) / initial_investment * 100
-    return final_portfolio_value, total_profit_ratio
-
-@st.cache_data
-def add_stock_data(stock_data, breakout_multiplier):
-    stock_data = pd.DataFrame(stock_data, dtype="float")
-    stock_data = calculate_atr(stock_data, breakout_multiplier)
-    return stock_data
-
-@st.cache_data
-def simulate_trading(stock_data, initial_investment):
-    stock_data['Portfolio_Value'] = stock_data['Profit'] * initial_investment
-    return stock_data
-
-def plot_volatility(stock_data, breakout_multiplier):
-    fig, ax1 = plt.subplots(figsize=(10, 5))
-
-    ax1.plot(stock_data.index, stock_data['Close'], label="Close Price", color='black', linestyle='-')
-    ax1.fill_between(stock_data.index, 
-                     stock_data['Low'].shift() - (stock_data['Range'] * breakout_multiplier), 
-                     stock_data['High'].shift() + (stock_data['Range'] * breakout_multiplier), 
-                     color='RED', alpha=0.3)
-    
-    ax1.set_xlabel('Date')
-    ax1.set_ylabel('Price')
-    ax1.legend(fontsize=8)
-    ax1.grid(True, axis='y')
-    plt.title('Stock Price with Volatility Breakout Levels')
-
-def plot_signals(stock_data, show_buy_timing):
-    if show_buy_timing:
-        buy_signals = stock_data[stock_data['Buy'] == 1]
-        plt.plot(buy_signals.index, buy_signals['Close'], '^', markersize=10, color='green', label='Buy Signal')
-
-@st.cache_data
+
+from backtest.breakout import add_stock_data, backtest_metrics, multiple_backtest, simulate_trading
+from backtest.bars import is_intraday, session_ohlc
+from backtest.costs import FRICTIONLESS
+from backtest.instrument import stage
+from backtest.optimizer import BREAKOUT
+from backtest.robustness import monte_carlo
+from backtest.service import chunked, concat_ranked
+from backtest.walkforward import breakout_walk_forward
+from charts import chart_key, downsample, render_chart
+from common import (RANK_COLUMNS, data_options, follow_job, generate_graph2, get_stock_data, robustness_options, shared_result, show_final_value,
+                    show_robustness, show_table, show_walk_forward, sidebar_footer, start_shared_job, walk_forward_options)
+from execution import cost_options
+from diagnostics import diagnostics_options, recording, show_diagnostics
+
+SWEEP_CHUNK = 25  # k values per background chunk
+
+def plot_volatility(ax, stock_data):
+    ax.plot(stock_data.index, stock_data['Close'], label="Close Price", color='black', linestyle='-')
+    ax.fill_between(stock_data.index, stock_data['Band_Low'], stock_data['Band_High'], color='RED', alpha=0.3)
+
+def plot_signals(ax, buy_signals):
+    if buy_signals is not None:
+        ax.plot(buy_signals.index, buy_signals['Close'], '^', markersize=10, color='green', label='Buy Signal')
+
 def generate_graph(stock_data, show_buy_timing, breakout_multiplier):
-    plt.figure(figsize=(10, 5))
-    plt.plot(stock_data.index, stock_data['Close'], label='Close Price', color='black')
-    
-    plot_volatility(stock_data, breakout_multiplier)  # Add Volatility Breakout Levels Graph
-    plot_signals(stock_data, show_buy_timing)
+    # Volatility breakout levels, then min/max-decimated on Close before drawing
+    levels = stock_data.sort_index(ascending=True)
+    levels = levels[['Close']].assign(
+        Band_Low=levels['Low'].shift() - (levels['Range'] * breakout_multiplier),
+        Band_High=levels['High'].shift() + (levels['Range'] * breakout_multiplier),
+    )
+    sampled = downsample(levels, 'Close')
+    buy_signals = stock_data.loc[stock_data['Buy'] == 1, ['Close']] if show_buy_timing else None
     
-    plt.xlabel('Date')
-    plt.ylabel('Price')
-    plt.legend(fontsize=8)
-    plt.grid(True, axis='y')
-    plt.title('Stock Price with Volatility Breakout Strategy')   
-    st.pyplot(plt)
-
-@st.cache_data
-def generate_graph2(stock_data):
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.plot(stock_data.index, stock_data['Portfolio_Value'], label='Total Asset Values')
-
-    plt.gca().yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))
-    plt.title('Portfolio Values Over Time')
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Amount')
-    ax.legend()
-    ax.grid(True)
-    st.pyplot(fig)
+    def draw(fig):
+        ax = fig.subplots()
+        plot_volatility(ax, sampled)  # Add Volatility Breakout Levels Graph
+        plot_signals(ax, buy_signals)
+        
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Price')
+        ax.legend(fontsize=8)
+        ax.grid(True, axis='y')
+        ax.set_title('Stock Price with Volatility Breakout Strategy')
     
-@st.cache_data
-def generate_multiple_backtest(stock_data, initial_investment):
-    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Backtesting Results</p>", unsafe_allow_html=True)
+    st.image(render_chart(chart_key('breakout_price', sampled, buy_signals), draw), width='stretch')
 
+def show_multiple_backtest(results_df, final=True):
     col1, col2 = st.columns(2)
 
     with col1:
-        results = []
-        for breakout_multiplier in np.arange(0.1, 0.9, 0.1):
-            final_portfolio_value2, total_profit_ratio2 = calculate_backtest(stock_data, breakout_multiplier, initial_investment)
-            results.append({
-                'Magic Number(k)': breakout_multiplier,
-                'Final Portfolio Value': final_portfolio_value2,
-                'Total Profit Ratio (%)': total_profit_ratio2
-            })
-        results_df = pd.DataFrame(results)
-        results_df['Profit Ranking'] = results_df['Final Portfolio Value'].rank(ascending=False, method='min').astype(int)
-        styled_df = results_df.style.apply(
-            lambda row: ['background-color:LightCyan'] * len(row) if row['Profit Ranking'] == 1 else [''] * len(row),
-            axis=1
-        )
-        st.dataframe(styled_df, width=600, height=350)
+        show_table(results_df, 'breakout_sweep', highlight=('Profit Ranking', 1), controls=final, width=600, height=350)
         # st.write(styled_df)
         
     with col2:
-        plt.figure(figsize=(10, 6))
-        plt.plot(results_df['Magic Number(k)'], results_df['Final Portfolio Value'], marker='o', linestyle='-', color='b', label='Final Portfolio Value')
-        plt.gca().yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))   # y-axis to integer
-        plt.xlabel('Magic Number (k)')
-        plt.ylabel('Final Portfolio Value')
-        plt.title('Final Portfolio Value by Magic Number (k)')
-        plt.grid(True)
-        st.pyplot(plt)
+        def draw(fig):
+            ax = fig.subplots()
+            ax.plot(results_df['Magic Number(k)'], results_df['Final Portfolio Value'], marker='o', linestyle='-', color='b', label='Final Portfolio Value')
+            ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))   # y-axis to integer
+            ax.set_xlabel('Magic Number (k)')
+            ax.set_ylabel('Final Portfolio Value')
+            ax.set_title('Final Portfolio Value by Magic Number (k)')
+            ax.grid(True)
         
-def sidebar_options():
-    ticker = st.sidebar.selectbox(
-        "Select Stock Ticker", 
-        ["TQQQ", "QQQ", "SOXL", "SOXX", "GOOGL", "MSFT", "AAPL", "NVDA", "AMZN"],
-        index=0
-    )
-    
-    today = date.today()
-    default_start_date = today - timedelta(days=365)
-    
-    col1, col2 = st.sidebar.columns(2)
-    with col1:
-        start_date = st.date_input("Start Date", default_start_date)
-    with col2:
-        end_date = st.date_input("End Date", today)
+        st.image(render_chart(chart_key('breakout_sweep', results_df), draw, figsize=(10, 6)), width='stretch')
+
+def generate_multiple_backtest(stock_data, initial_investment, breakout_multipliers=np.arange(0.1, 0.9, 0.1), rank_by='Final Portfolio Value', costs=FRICTIONLESS):
+    st.markdown(f"<p style='font-size:18px; color:MediumAquaMarine;'>Backtesting Results</p>", unsafe_allow_html=True)
+    # Runs in the background a batch of k values at a time, shared between sessions; the table fills in as batches finish
+    def compute(stock_data, k_chunk):
+        return multiple_backtest(stock_data, initial_investment, k_chunk, metrics=True, rank_by=rank_by, costs=costs)
+    job = start_shared_job('breakout_sweep', stock_data, compute, chunked(np.asarray(breakout_multipliers).tolist(), SWEEP_CHUNK),
+                           partial(concat_ranked, rank_by=rank_by), initial_investment, rank_by, costs)
+    follow_job(job, show_multiple_backtest, unit='k batches')
         
-    if start_date > today or end_date > today or start_date > end_date:
-        st.sidebar.error("Invalid date selection.")
-        start_date = default_start_date
-        end_date = today
+def generate_walk_forward(stock_data, initial_investment, train_bars, test_bars, anchored):
+    windows_df, equity = shared_result('breakout_walk_forward', stock_data, breakout_walk_forward, initial_investment, train_bars, test_bars, anchored)
+    show_walk_forward(windows_df, equity, 'breakout_walk_forward')
+
+def generate_robustness(stock_data, params, initial_investment, n_paths, method, block, costs=FRICTIONLESS):
+    results_df = shared_result('monte_carlo', stock_data, monte_carlo, BREAKOUT, params, initial_investment, n_paths, method, block, seed=0, costs=costs)
+    show_robustness(results_df, n_paths, 'breakout_robustness')
 
+def sidebar_options():
+    ticker, start_date, end_date, interval = data_options("Intraday bars are combined into daily sessions for the breakout rule.")
+        
     show_dataset_asecending = st.sidebar.checkbox("Show Dataset Ascending", value=True)
     show_multiple_backtest = st.sidebar.checkbox("Show Multiple Backtesting Results", value=False)
+    breakout_multipliers, rank_by = np.arange(0.1, 0.9, 0.1), RANK_COLUMNS[0]
+    if show_multiple_backtest:
+        with st.sidebar.expander("### Multiple Backtesting Options", expanded=False):
+            k_min, k_max = st.slider("Breakout Multiplier(k) Range", min_value=0.0, max_value=1.0, value=(0.1, 0.8), step=0.05)
+            k_step = st.number_input("Breakout Multiplier(k) Step", min_value=0.001, value=0.1, step=0.01, format="%.3f")
+            breakout_multipliers = np.round(np.arange(k_min, k_max + k_step / 2, k_step), 4)
+            rank_by = st.selectbox("Rank By", RANK_COLUMNS, index=0)
+    walk_forward = walk_forward_options()
+    robustness = robustness_options()
     breakout_multiplier = st.sidebar.slider("Breakout Multiplier(k)", min_value=0.0, max_value=1.0, value=0.4, step=0.1)
     
     show_buy_timing, show_sell_timing = False, False        
@@ -173,13 +108,14 @@ def sidebar_options():
     
     initial_investment = st.sidebar.number_input("Initial Investment Amount", min_value=0, value=1500000, step=10000)
 
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>Coded by Mathilda</p>", unsafe_allow_html=True)
-    st.sidebar.markdown("<p style='text-align: center; font-size: 12px;'>@2024</p>", unsafe_allow_html=True)
+    costs = cost_options()  # Fill Price and Fractional Shares do not apply: breakout trades the whole balance at Target
+    recorder = diagnostics_options()
+    
+    sidebar_footer()
     
-    return (ticker, start_date, end_date, breakout_multiplier, 
+    return (ticker, start_date, end_date, interval, breakout_multiplier, 
             show_dataset_asecending, show_buy_timing,
-            initial_investment, show_multiple_backtest)
+            initial_investment, show_multiple_backtest, breakout_multipliers, rank_by, walk_forward, robustness, costs, recorder)
     
 def main():
     st.set_page_config(page_title="Stock Price Viewer", page_icon="📈", layout='wide')
@@ -188,42 +124,65 @@ def main():
     sidebar_result = sidebar_options()
     
     if sidebar_result is not None:
-        (ticker, start_date, end_date, breakout_multiplier, 
+        (ticker, start_date, end_date, interval, breakout_multiplier, 
         show_dataset_asecending, show_buy_timing,
-        initial_investment, show_multiple_backtest) = sidebar_result
+        initial_investment, show_multiple_backtest, breakout_multipliers, rank_by, walk_forward, robustness, costs, recorder) = sidebar_result
         
-        stock_data = get_stock_data(ticker, start_date, end_date)
-        # print(stock_data)
-
-        stock_data = add_stock_data(stock_data, breakout_multiplier)
-        stock_data = simulate_trading(stock_data, initial_investment).sort_index(ascending=show_dataset_asecending)
-        stock_data = stock_data.sort_index(ascending=show_dataset_asecending)
-        # print(stock_data)
+        with recording(recorder):
+            with stage('get_stock_data', cached=True) as record:
+                stock_data = get_stock_data(ticker, start_date, end_date, interval, dropna=True)
+                record['rows'] = len(stock_data)
+            if is_intraday(interval):
+                stock_data = session_ohlc(stock_data)
+            stock_data_orig = stock_data
+            # print(stock_data)
+
+            with stage('add_stock_data') as record:
+                metrics = backtest_metrics(stock_data, breakout_multiplier, initial_investment, costs=costs)
+                stock_data = add_stock_data(stock_data, breakout_multiplier, costs=costs)
+                stock_data = simulate_trading(stock_data, initial_investment, costs)
+                stock_data = stock_data.sort_index(ascending=show_dataset_asecending)
+                record['rows'] = len(stock_data)
+            # print(stock_data)
         
-        st.dataframe(stock_data, width=1200, height=400)
+            with stage('st.dataframe'):
+                show_table(stock_data, 'stock_data', width=1200, height=400)
         
-        final_portfolio_value = stock_data.sort_values(by='Date', ascending=True)['Portfolio_Value'].iloc[-1]
-        total_profit_ratio = (final_portfolio_value - initial_investment) / initial_investment * 100
-        color = "hotpink" if total_profit_ratio > 0 else "blue"
-        st.markdown(f"<p style='font-size:18px; color:{color};'>Final Portfolio Amount : {final_portfolio_value:,.2f} ({total_profit_ratio:.2f}%)</p>", unsafe_allow_html=True)
+            show_final_value(metrics)
         
-        col1, col2 = st.columns(2)
+            col1, col2 = st.columns(2)
         
-        if show_multiple_backtest:
-            col1_expanded_flag, col2_expanded_flag = False, False
-        else:
-            col1_expanded_flag, col2_expanded_flag = True, True
+            if show_multiple_backtest:
+                col1_expanded_flag, col2_expanded_flag = False, False
+            else:
+                col1_expanded_flag, col2_expanded_flag = True, True
             
-        with col1:
-            with st.expander("### Show Graph : Stock Price with Volatility Breakout", expanded=col1_expanded_flag):
-                generate_graph(stock_data, show_buy_timing, breakout_multiplier)
-
-        with col2:
-            with st.expander("### Show Graph : Total Asset Change", expanded=col2_expanded_flag):
-                generate_graph2(stock_data)
+            with col1:
+                with st.expander("### Show Graph : Stock Price with Volatility Breakout", expanded=col1_expanded_flag):
+                    with stage('generate_graph'):
+                        generate_graph(stock_data, show_buy_timing, breakout_multiplier)
+
+            with col2:
+                with st.expander("### Show Graph : Total Asset Change", expanded=col2_expanded_flag):
+                    with stage('generate_graph2'):
+                        generate_graph2(stock_data, 'breakout_portfolio')
         
-        if show_multiple_backtest:
-            generate_multiple_backtest(stock_data, initial_investment)
+            if show_multiple_backtest:
+                with stage('generate_multiple_backtest', cached=True) as record:
+                    generate_multiple_backtest(stock_data, initial_investment, breakout_multipliers, rank_by, costs)
+                    record['rows'] = len(breakout_multipliers)
+
+            if walk_forward is not None:
+                with stage('generate_walk_forward', cached=True):
+                    generate_walk_forward(stock_data_orig.sort_index(), initial_investment, *walk_forward)
+
+            if robustness is not None:
+                with stage('generate_robustness', cached=True) as record:
+                    generate_robustness(stock_data_orig.sort_index(), {'breakout_multiplier': breakout_multiplier},
+                                        initial_investment, *robustness, costs)
+                    record['rows'] = robustness[0]
+
+        show_diagnostics(recorder)
 
 if __name__ == "__main__":
     main()
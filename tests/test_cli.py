@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from backtest.cli import load_jobs, run_jobs
+
+
+class FakeStore:
+    def get(self, ticker, start, end, interval):
+        rng = np.random.default_rng(len(ticker))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 500)))
+        open_ = close * np.exp(rng.normal(0, 0.005, 500))
+        return pd.DataFrame({'Open': open_, 'High': np.maximum(open_, close) * 1.01, 'Low': np.minimum(open_, close) * 0.99,
+                             'Close': close}, index=pd.date_range(start, periods=500, freq='B', name='Date'))
+
+
+def test_mixed_jobs_keep_integer_parameter_columns(tmp_path):
+    job_file = tmp_path / 'jobs.json'
+    job_file.write_text(json.dumps({'jobs': [
+        {'tickers': ['QQQ', 'TQQQ'], 'start': '2020-01-01', 'end': '2022-01-01',
+         'runs': [['bollinger', {'buy_portion': 5}], ['breakout', {'breakout_multiplier': 0.4}]]},
+        {'tickers': ['QQQ'], 'start': '2020-01-01', 'end': '2022-01-01', 'strategy': 'bollinger',
+         'buy_portions': [2, 3], 'sell_portions': [4]},
+        {'tickers': ['QQQ'], 'start': '2020-01-01', 'end': '2022-01-01', 'strategy': 'breakout', 'breakout_multipliers': [0.4]},
+    ]}))
+    initial_investment, jobs = load_jobs(job_file)
+    results_df = run_jobs(jobs, initial_investment, FakeStore(), max_workers=1)
+
+    assert len(results_df) == 7
+    for column in ['Buy Portion', 'Sell Portion']:
+        assert results_df[column].dtype == 'Int64'
+        bollinger = results_df['Strategy'] == 'Bollinger Bands'
+        assert results_df.loc[bollinger, column].notna().all() and results_df.loc[~bollinger, column].isna().all()
+    assert sorted(results_df.loc[results_df['Strategy'] == 'Bollinger Bands', 'Buy Portion']) == [2, 3, 5, 5]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from backtest.optimizer import BOLLINGER, BREAKOUT, OptimizationPool, rank_results, run_optimization
+
+
+def make_prices(n_bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.01, n_bars)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.01, n_bars)))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close},
+                        index=pd.date_range('2020-01-01', periods=n_bars, freq='B', name='Date'))
+
+
+def test_per_ticker_runs_share_one_pool():
+    price_data = {'A': make_prices(400, 1), 'B': make_prices(300, 2)}
+    date_windows = [('2020-01-01', '2020-12-31'), ('2020-06-01', '2021-03-31')]
+    strategy_params = {BOLLINGER: {'buy_portions': [2, 5], 'sell_portions': [3, 4]},
+                       BREAKOUT: {'breakout_multipliers': [0.3, 0.6]}}
+
+    with OptimizationPool(price_data, max_workers=2) as pool:
+        tables = list(pool.run(['A'], date_windows, strategy_params, 1500000))
+        executor, shm_name = pool._executor, pool._shm.name
+        tables += list(pool.run(['B'], date_windows, strategy_params, 1500000))
+        assert pool._executor is executor and pool._shm.name == shm_name
+    assert pool._executor is None
+
+    expected = rank_results(list(run_optimization(price_data, date_windows, strategy_params, 1500000, max_workers=2)))
+    pd.testing.assert_frame_equal(rank_results(tables), expected)
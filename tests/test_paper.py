@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.paper import PollingSource
+from backtest.store import normalize_ohlcv
+
+
+@pytest.fixture(params=['UTC', 'Asia/Tokyo', 'Pacific/Kiritimati', 'America/Los_Angeles'])
+def host_zone(request, monkeypatch):
+    # Host clock in a different zone from the exchange (New York)
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def exchange_bars(last_started_seconds_ago, count=3):
+    # 1m bars as yfinance returns them: New York time, the last one started last_started_seconds_ago
+    now = pd.Timestamp.now(tz='UTC').floor('s')
+    index = pd.DatetimeIndex([now - pd.Timedelta(seconds=last_started_seconds_ago + 60 * i) for i in reversed(range(count))])
+    values = np.arange(count, dtype=float) + 1
+    return pd.DataFrame({'Open': values, 'High': values, 'Low': values, 'Close': values, 'Volume': values},
+                        index=index.tz_convert('America/New_York'))
+
+
+class FakeStore:
+    def __init__(self, frames):
+        self.frames = frames
+
+    def get(self, ticker, start, end, interval):
+        return normalize_ohlcv(self.frames.pop(0) if len(self.frames) > 1 else self.frames[0])
+
+
+def test_forming_bar_is_held_back(host_zone):
+    source = PollingSource(FakeStore([]), '1m')
+    stock_data = normalize_ohlcv(exchange_bars(1))
+    assert len(source.closed_bars(stock_data)) == 2
+    assert len(source.closed_bars(exchange_bars(1))) == 2  # tz-aware frames work too
+
+
+def test_closed_bar_is_emitted(host_zone):
+    source = PollingSource(FakeStore([]), '1m')
+    assert len(source.closed_bars(normalize_ohlcv(exchange_bars(61)))) == 3
+
+
+def test_forming_bar_is_emitted_once_closed(host_zone):
+    # Next poll: the last bar has its final values and a newer bar has started after it
+    forming, later = exchange_bars(1), exchange_bars(-59, count=4)
+    later.iloc[-2] = 9.0
+    source = PollingSource(FakeStore([forming, later]), '1m', poll_seconds=0)
+
+    async def collect():
+        bars = []
+        async for bar in source.subscribe(['QQQ']):
+            bars.append(bar)
+            if len(bars) == 3:
+                return bars
+
+    bars = asyncio.run(asyncio.wait_for(collect(), 5))
+    assert [bar.close for bar in bars] == [1.0, 2.0, 9.0]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.engine import simulate_trades
+from backtest.portfolio import align_prices, bollinger_portfolio, breakout_portfolio
+from backtest.strategies import bollinger_signals
+
+
+def make_prices(n_bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.01, n_bars)))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.01, n_bars)))
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close},
+                        index=pd.date_range('2020-01-01', periods=n_bars, freq='B', name='Date'))
+
+
+def test_breakout_sizing_ignores_the_entry_bar_close():
+    price_data = {f'T{i}': make_prices(300, i) for i in range(3)}
+    _, weights, _ = breakout_portfolio(price_data, 1e6, 0.3, allocation='inverse_volatility')
+    # A bar after the volatility warm-up where several tickers broke out
+    entry = next(t for t in range(30, len(weights)) if (weights[t] > 0).sum() >= 2)
+
+    perturbed = {ticker: stock_data.copy() for ticker, stock_data in price_data.items()}
+    perturbed['T0'].iloc[entry, perturbed['T0'].columns.get_loc('Close')] *= 1.5
+    perturbed['T0'].iloc[entry, perturbed['T0'].columns.get_loc('High')] *= 1.5
+    _, perturbed_weights, _ = breakout_portfolio(perturbed, 1e6, 0.3, allocation='inverse_volatility')
+
+    np.testing.assert_array_equal(perturbed_weights[entry], weights[entry])
+
+
+@pytest.mark.parametrize('buy_portion, sell_portion', [(5, 4), (2, 3), (20, 2)])
+def test_single_ticker_bollinger_portfolio_matches_engine(buy_portion, sell_portion):
+    stock_data = make_prices(1000, 7)
+    summary, _, _ = bollinger_portfolio({'T': stock_data}, 1500000, buy_portion, sell_portion)
+    close = stock_data['Close'].to_numpy()
+    expected = simulate_trades(close, bollinger_signals(close), 1500000, buy_portion, sell_portion)[3]
+    np.testing.assert_array_equal(summary['Portfolio_Value'].to_numpy(), expected)
+
+
+def test_align_prices_rejects_an_empty_universe():
+    with pytest.raises(ValueError):
+        align_prices({})
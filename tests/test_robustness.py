@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from backtest.costs import FRICTIONLESS, ExecutionModel
+from backtest.optimizer import BOLLINGER
+from backtest.robustness import bootstrap_paths, path_equity
+from backtest.strategies import band_signals, bollinger_bands
+from backtest.sweep import sweep_equity
+
+
+def make_ohlc(n_bars, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n_bars))
+    return open_, np.maximum(open_, close) * 1.01, np.minimum(open_, close) * 0.99, close
+
+
+@pytest.mark.parametrize('costs', [FRICTIONLESS, ExecutionModel(commission_bps=5, spread_bps=2, fill='next_open'),
+                                   ExecutionModel(commission_fixed=3, fractional=True)])
+def test_stacked_bollinger_paths_match_one_sweep_per_path(costs):
+    open_, high, low, close = bootstrap_paths(*make_ohlc(600, 1), 32, np.random.default_rng(0))
+    params = {'buy_portion': 3, 'sell_portion': 4}
+    equity = path_equity(open_, high, low, close, BOLLINGER, params, 1500000, costs)
+
+    for i in range(len(close)):
+        _, upper, lower = bollinger_bands(close[i])
+        signal = band_signals(close[i], upper, lower)
+        expected = sweep_equity(close[i], signal, 1500000, [3], [4], costs, open_[i])[0]
+        np.testing.assert_array_equal(equity[i], expected)
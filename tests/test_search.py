@@ -0,0 +1,28 @@
+import pytest
+
+from backtest.search import successive_halving
+
+
+class RecordingObjective:
+    # Scores depend only on the parameters, so every rung agrees on the ranking
+    def __init__(self, n_bars):
+        self.n_bars = n_bars
+        self.calls = []
+
+    def __call__(self, params, start=0, stop=None):
+        self.calls.append((tuple(params.values()), stop))
+        return params['a'] * 10 + params['b']
+
+
+@pytest.mark.parametrize('n_bars', [300, 600, 2500, 20000])
+def test_rung_lengths_strictly_increase(n_bars):
+    objective = RecordingObjective(n_bars)
+    results = successive_halving({'a': range(9), 'b': range(9)}, objective, budget=81, seed=0)
+
+    lengths = []
+    for _, stop in objective.calls:
+        if not lengths or lengths[-1] != stop:
+            lengths.append(stop)
+    assert lengths == sorted(set(lengths)) and lengths[-1] == n_bars
+    assert len(set(objective.calls)) == len(objective.calls)
+    assert results == [({'a': 8, 'b': 8}, 88)]
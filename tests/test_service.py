@@ -0,0 +1,36 @@
+import threading
+import time
+
+import pandas as pd
+
+from backtest.service import BacktestService, ResultCache, chunked, concat_ranked
+
+
+def test_run_during_long_job_finishes_first(tmp_path):
+    service = BacktestService(ResultCache(tmp_path), max_workers=1, job_workers=1)
+    release = threading.Event()
+
+    def slow_chunk(chunk):
+        release.wait(5)
+        return pd.DataFrame({'x': list(chunk), 'v': [float(c) for c in chunk]})
+
+    job = service.start('sweep', slow_chunk, chunked(range(10), 1), lambda parts: concat_ranked(parts, 'v'))
+    started = time.perf_counter()
+    assert service.run('walk_forward', lambda: 42) == 42
+    assert time.perf_counter() - started < 1
+    assert job.status == 'running'
+
+    release.set()
+    assert job.wait(5)
+    assert job.status == 'done'
+    service.shutdown()
+
+
+def test_job_cleanup_runs_once_finished(tmp_path):
+    service = BacktestService(ResultCache(tmp_path))
+    cleaned = []
+    job = service.start('sweep', lambda chunk: pd.DataFrame({'v': list(chunk)}), chunked(range(4), 2),
+                        lambda parts: concat_ranked(parts, 'v'), cleanup=lambda: cleaned.append(True))
+    assert job.wait(5)
+    assert job.status == 'done' and cleaned == [True]
+    service.shutdown()